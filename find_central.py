@@ -1,17 +1,22 @@
 # Core imports
 import json
+import os
 from glob import glob
 
 # Library imports
 import networkx as nx
 import click
+import numpy as np
 from tqdm import tqdm
 
+from graph_generation.centrality_store import CENTRALITY_METRICS, CentralityStore
+from graph_generation.paper_store import StringTable
+
 SAVE_FOLDER = "./sorted_data/"
 
 
 def sort_and_save(data, filename: str, key: str):
-    write_filename = SAVE_FOLDER + filename.split("/")[-1] + ".{}.json".format(key)
+    write_filename = SAVE_FOLDER + os.path.basename(os.path.normpath(filename)) + ".{}.json".format(key)
 
     with open(write_filename, "w") as f:
         tqdm.write("Sorting by {}".format(key))
@@ -21,26 +26,72 @@ def sort_and_save(data, filename: str, key: str):
         tqdm.write("Done!")
 
 
+def sort_and_save_columns(node_ids: list, columns: dict, filename: str, key: str):
+    """`sort_and_save` for the columns read from a centrality store, sorted by numpy"""
+    write_filename = SAVE_FOLDER + os.path.basename(os.path.normpath(filename)) + ".{}.json".format(key)
+
+    with open(write_filename, "w") as f:
+        tqdm.write("Sorting by {}".format(key))
+        order = np.argsort(-columns[key], kind="stable").tolist()
+        values = {metric: column.tolist() for metric, column in columns.items()}
+        sorted_data = [
+            (node_ids[row], {metric: column[row] for metric, column in values.items()}) for row in order
+        ]
+        tqdm.write("Saving it")
+        json.dump(sorted_data, f)
+        tqdm.write("Done!")
+
+
 @click.command()
 @click.argument("path", type=click.Path(exists=True))
-def find_central(path):
+@click.option(
+    "--id-dictionary",
+    default=None,
+    type=click.Path(exists=True),
+    help="Path of the dense ids dictionary the graphs were generated with, to save the original ids",
+)
+@click.option(
+    "--metric",
+    "metrics",
+    multiple=True,
+    help="Metric to sort by (can be repeated), by default every one",
+)
+def find_central(path, id_dictionary, metrics):
     """
     PATH is a .gpickle file that we want to sort
     by their features or a path where we want to do it
-    in all the files contained by it
+    in all the files contained by it.
+
+    PATH can also be a centrality store (GML/centralities/...),
+    from which only the columns of the metrics are read
     """
 
+    ids = StringTable.load(id_dictionary, "ids") if id_dictionary else None
+
     for filename in tqdm(glob(path)):
 
         tqdm.write("Reading {}".format(filename))
+        if CentralityStore.exists(filename):
+            store = CentralityStore(filename)
+            columns = store.columns([metric for metric in metrics or store.metrics if metric in store.metrics])
+
+            node_ids = store.node_ids().tolist()
+            if ids is not None:
+                node_ids = [ids[node] if isinstance(node, int) else node for node in node_ids]
+
+            for metric in columns:
+                sort_and_save_columns(node_ids, columns, filename, metric)
+            continue
+
         data = list(nx.read_gpickle(filename).nodes(data=True))
 
-        sort_and_save(data, filename, "degree")
-        sort_and_save(data, filename, "indegree")
-        sort_and_save(data, filename, "outdegree")
-        sort_and_save(data, filename, "closeness")
-        sort_and_save(data, filename, "betweenness")
-        sort_and_save(data, filename, "pagerank")
+        if ids is not None:
+            data = [(ids[node] if isinstance(node, int) else node, attributes) for node, attributes in data]
+
+        # Only the centralities computed for the graph, as not every one always is
+        computed = [metric for metric in CENTRALITY_METRICS if any(metric in attributes for _, attributes in data)]
+        for metric in metrics or computed:
+            sort_and_save(data, filename, metric)
 
 
 if __name__ == "__main__":
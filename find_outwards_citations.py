@@ -3,9 +3,12 @@
 import json
 from tqdm import tqdm
 
+from graph_generation.paper_store import PaperStore
+
 DATASET_SIZE = 4_107_340
 GML_BASE_PATH = "../GML/"
 DBLP_FILENAME = "dblp_papers_v11.txt"
+PAPER_STORE_PATH = "./dblp_arnet/paper_store_v11"
 CONFERENCES = [
     "1184914352",
     "1127325140",
@@ -45,9 +48,25 @@ def get_data(dictionary: dict = {}) -> dict:
     }
 
 
-json_filename = "./dblp_arnet/CS_Rankings.json"
-with open(json_filename, "r") as f:
-    conference_papers = json.load(f)
+def read_from_store(path: str) -> dict:
+    """Read the conference papers from the columnar paper store, keyed by year as in the JSON"""
+    store = PaperStore(path)
+
+    conference_papers = {}
+    for row in tqdm(store.rows_for_venue_ids(CONFERENCES).tolist()):
+        paper = store.get_data(row)
+        paper["venue_id"] = paper.pop("venue")["id"]
+        conference_papers.setdefault(str(paper["year"]), []).append(paper)
+
+    return conference_papers
+
+
+if PaperStore.exists(PAPER_STORE_PATH):
+    conference_papers = read_from_store(PAPER_STORE_PATH)
+else:
+    json_filename = "./dblp_arnet/CS_Rankings.json"
+    with open(json_filename, "r") as f:
+        conference_papers = json.load(f)
 
 
 # Store older_papers in an arrray
@@ -4,67 +4,101 @@
 import json
 import tqdm
 
+from graph_generation.paper_store import PaperStore
 
-s_venue = "international conference on learning representations"
-iclr = set()
-
-fw = open("dblp_arnet/iclr_list.txt", "w")
-
-with open("dblp_arnet/dblp_papers_v11.txt", "r") as fp:
-    for line in tqdm.tqdm(fp, total=4107340):
-        p = json.loads(line)
-        pid = p["id"]
-        # print(pid)
-        try:
-            if s_venue in p["venue"]["raw"].lower():
-                fw.write(pid + "\n")
-                iclr.add(int(pid))
-                fw.flush()
-            # end if
-        except KeyError:
-            pass
-            # print("No venue found: ", pid)
-fw.close()
-
-s_venue = "arxiv"
-arxiv = set()
-
-
-fw = open("dblp_arnet/" + s_venue + "_list.txt", "w")
-nvf = 0
-
-with open("dblp_arnet/dblp_papers_v11.txt", "r") as fp:
-    for line in tqdm.tqdm(fp, total=4107340):
-        p = json.loads(line)
-        pid = p["id"]
-        # print(pid)
-        try:
-            if s_venue in p["venue"]["raw"].lower() and pid not in iclr:
-                fw.write(pid + "\n")
-                arxiv.add(int(pid))
-                fw.flush()
-            # end if
-        except KeyError:
-            nvf += 1
-            # print("No venue found: ", pid)
-fw.close()
-
-
-fw = open("dblp_arnet/journal_list.txt", "w")
-
-with open("dblp_arnet/dblp_papers_v11.txt", "r") as fp:
-    for line in tqdm.tqdm(fp, total=4107340):
-        p = json.loads(line)
-        pid = p["id"]
-        # print(pid)
-        try:
-            if "journal" in p["doc_type"].lower() and pid not in arxiv and pid not in iclr:
-                fw.write(pid + "\n")
-                fw.flush()
-            # end if
-        except KeyError:
-            pass
-            # print("No venue found: ", pid)
-fw.close()
+DBLP_FILENAME = "dblp_arnet/dblp_papers_v11.txt"
+PAPER_STORE_PATH = "dblp_arnet/paper_store_v11"
 
+
+def read_papers():
+    """
+    Yield the raw json of every paper, or, if the columnar paper store was built,
+    a lighter dict with only the fields we use here read from it
+    """
+    if not PaperStore.exists(PAPER_STORE_PATH):
+        with open(DBLP_FILENAME, "r") as fp:
+            for line in tqdm.tqdm(fp, total=4107340):
+                yield json.loads(line)
+        return
+
+    store = PaperStore(PAPER_STORE_PATH)
+    for row in tqdm.trange(len(store)):
+        p = {"id": store.ids[store.paper_id[row]]}
+        if store.venue[row] >= 0:
+            p["venue"] = {"raw": store.venues[store.venue[row]]}
+        if store.doc_type[row] >= 0:
+            p["doc_type"] = store.doc_types[store.doc_type[row]]
+        yield p
+
+
+class Category:
+    """
+    A named class of papers, written to `filename`. A paper belongs to it if it
+    matches `predicate` and doesn't belong to any of the `exclude` categories,
+    which must be listed before this one
+    """
+
+    def __init__(self, name: str, filename: str, predicate, exclude=()):
+        self.name = name
+        self.filename = filename
+        self.predicate = predicate
+        self.exclude = set(exclude)
+
+
+def venue_contains(text: str):
+    return lambda p: text in p["venue"]["raw"].lower()
+
+
+def doc_type_contains(text: str):
+    return lambda p: text in p["doc_type"].lower()
+
+
+CATEGORIES = [
+    Category(
+        "iclr",
+        "dblp_arnet/iclr_list.txt",
+        venue_contains("international conference on learning representations"),
+    ),
+    Category("arxiv", "dblp_arnet/arxiv_list.txt", venue_contains("arxiv"), exclude=["iclr"]),
+    Category("journal", "dblp_arnet/journal_list.txt", doc_type_contains("journal"), exclude=["iclr", "arxiv"]),
+]
+
+
+def classify(papers, categories):
+    """
+    Write the ids of the papers in each category to its file, in a single pass
+    over `papers`. Returns how many papers were in each category, and how many
+    had no venue
+    """
+    counts = {category.name: 0 for category in categories}
+    nvf = 0
+
+    files = {category.name: open(category.filename, "w", buffering=1024 * 1024) for category in categories}
+    try:
+        for p in papers:
+            pid = p["id"]
+            if "raw" not in (p.get("venue") or {}):
+                nvf += 1
+
+            matched = set()
+            for category in categories:
+                if category.exclude & matched:
+                    continue
+
+                try:
+                    if category.predicate(p):
+                        matched.add(category.name)
+                        files[category.name].write(pid + "\n")
+                        counts[category.name] += 1
+                except (KeyError, TypeError, AttributeError):
+                    pass
+    finally:
+        for fw in files.values():
+            fw.close()
+
+    return counts, nvf
+
+
+counts, nvf = classify(read_papers(), CATEGORIES)
+print(counts)
 print(nvf)
@@ -0,0 +1,577 @@
+# Centralities over a shared CSR graph, computed by a pool of workers
+#
+# The graph is written once as a `CSRGraph` to a temporary directory, every worker
+# mmaps it in the pool initializer, and tasks are just (start, end) ranges of the
+# source positions to run from. Ranges are handed out to whichever worker is free,
+# and merged as they arrive. For betweenness, whose sweeps cost very different from
+# source to source on citation graphs, the depth and edges reached from every source
+# are measured first (64 sources per BFS, like closeness), and sources are split in
+# ranges of about the same estimated cost, most expensive first, so a few hub-heavy
+# ranges don't run long after the rest finished. Small jobs run without a pool.
+# With an `address`, ranges go to workers on other hosts instead of to a local pool
+# (see `distributed_centrality.py`).
+#
+# Each source is a level-synchronous BFS over numpy
+# arrays, with distance, path count and dependency buffers reused between sources.
+# Closeness, which only needs distances, runs 64 sources per BFS, as bits of a word.
+# When betweenness and closeness are both needed, `fused_centralities` sums closeness
+# and harmonic distances from the betweenness sweep itself, instead of a second pass.
+#
+# With a `checkpoint_dir`, every finished range is saved there as soon as it is done,
+# and a `resume`d job only runs the ranges missing from it, so an interrupted run on
+# a large snapshot doesn't start again from zero. The checkpoints are left to the
+# caller, to remove once it saved the result, so a crash in between loses nothing.
+
+# Core imports
+import json
+import os
+import shutil
+import tempfile
+from functools import partial
+from multiprocessing import Pool
+from typing import Callable, List, Optional, Tuple
+
+# Library imports
+import numpy as np
+from tqdm import tqdm
+
+import distributed_centrality
+from csr_graph import CSRGraph
+
+# Graph and sources the worker attached to, set by `_attach`
+_GRAPH: Optional[CSRGraph] = None
+_SOURCES: Optional[np.ndarray] = None
+
+# Cost of a sweep from a source, in edges visited: each BFS level, and each source, also
+# has a fixed cost in numpy calls, measured at about 450 and 370 times that of an edge
+LEVEL_COST = 450
+SOURCE_COST = 370
+
+# Below this estimated cost, starting a pool costs more than it saves
+SERIAL_COST = 1_000_000
+
+
+def _attach(path: str) -> None:
+    global _GRAPH, _SOURCES
+    _GRAPH = CSRGraph.load(path)
+    _SOURCES = np.load(os.path.join(path, "sources.npy"), mmap_mode="r")
+
+
+def _detach() -> None:
+    global _GRAPH, _SOURCES
+    _GRAPH, _SOURCES = None, None
+
+
+def source_ranges(n_sources: int, n_tasks: int, costs: np.ndarray = None) -> List[Tuple[int, int]]:
+    """
+    Split `n_sources` positions in (up to) `n_tasks` contiguous, non empty ranges,
+    of about the same total of `costs` (or the same size, without them)
+    """
+    if costs is None:
+        bounds = np.linspace(0, n_sources, min(n_tasks, n_sources) + 1).astype(np.int64)
+    else:
+        cumulative = np.cumsum(costs)
+        targets = cumulative[-1] * np.arange(1, n_tasks) / n_tasks if n_sources else []
+        bounds = np.concatenate([[0], np.searchsorted(cumulative, targets, side="right"), [n_sources]])
+    return [(int(start), int(end)) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def _run_range(task: Callable, source_range: Tuple[int, int]) -> tuple:
+    return source_range, task(source_range)
+
+
+def run_parallel(
+    G: CSRGraph,
+    sources: np.ndarray,
+    task: Callable,
+    shape: tuple,
+    processes: Optional[int] = None,
+    per_source: bool = False,
+    costs: Optional[np.ndarray] = None,
+    tasks_per_process: int = 4,
+    checkpoint_dir: Optional[str] = None,
+    resume: bool = False,
+    address: Optional[str] = None,
+    shared_dir: Optional[str] = None,
+) -> np.ndarray:
+    """
+    Run `task` over ranges of `sources` in a pool of workers attached to G, as they get
+    free, merging the result of each range as it arrives: summed into an array of `shape`,
+    or, if `per_source`, with the values of each source set at its position in it.
+    With the estimated `costs` of each source, ranges are of about the same cost, and
+    the most expensive go first. Jobs estimated below `SERIAL_COST` run in process.
+
+    With a `checkpoint_dir`, each range result is saved there once done, and
+    if `resume`, ranges already saved there are not run again. It is left there,
+    for the caller to remove once it saved the result.
+
+    With an `address` ("host:port"), ranges are served from it to the workers of
+    `distributed_centrality.py`, `processes` being how many there are in all hosts
+    (which must be given), and G is saved in `shared_dir`, which they must be able to read
+    """
+    if address is not None and processes is None:
+        raise ValueError(f"Pass how many workers, in all hosts, serve {address} as processes, to size its ranges")
+    if address is not None and shared_dir is None:
+        raise ValueError(f"Pass a shared_dir every worker of {address} can read, to save the graph to")
+    processes = processes or os.cpu_count()
+    name = getattr(task, "func", task).__name__
+
+    sources = np.asarray(sources, dtype=np.int32)
+    if costs is not None:
+        order = np.argsort(-costs, kind="stable")
+        sources, costs = sources[order], costs[order]
+        estimated_cost = costs.sum()
+    else:
+        estimated_cost = len(sources) * (len(G.indices) + SOURCE_COST)
+
+    serial = address is None and (processes == 1 or estimated_cost < SERIAL_COST)
+    ranges = source_ranges(len(sources), processes * tasks_per_process, costs)
+
+    done = {}
+    if checkpoint_dir is not None:
+        sources, ranges, done = _open_checkpoint(checkpoint_dir, G, sources, ranges, task, resume)
+    pending = [source_range for source_range in ranges if source_range not in done]
+
+    total = np.zeros(shape)
+
+    def merge(source_range: Tuple[int, int], result: np.ndarray) -> None:
+        start, end = source_range
+        if per_source:
+            total[..., sources[start:end]] = result
+        else:
+            total[...] += result
+
+    for source_range, result in done.items():
+        merge(source_range, result)
+
+    with tempfile.TemporaryDirectory(prefix="csr_graph_", dir=shared_dir) as path:
+        G.save(path)
+        np.save(os.path.join(path, "sources.npy"), sources)
+
+        pool = None
+        if address is not None:
+            print(f"Running {name} over {len(sources)} sources in {len(pending)} ranges in workers of {address}")
+            results = distributed_centrality.run_distributed(address, path, task, pending)
+        elif serial:
+            print(f"Running {name} over {len(sources)} sources in {len(pending)} ranges in process")
+            _attach(path)
+            results = map(partial(_run_range, task), pending)
+        else:
+            print(f"Running {name} over {len(sources)} sources in {len(pending)} ranges in {processes} cores")
+            pool = Pool(processes=processes, initializer=_attach, initargs=(path,))
+            results = pool.imap_unordered(partial(_run_range, task), pending)
+
+        try:
+            for source_range, result in tqdm(results, total=len(ranges), initial=len(done), unit="range"):
+                if checkpoint_dir is not None:
+                    _save_chunk(checkpoint_dir, source_range, result)
+                merge(source_range, result)
+        finally:
+            if pool is not None:
+                pool.terminate()
+            _detach()
+
+    return total
+
+
+def _chunk_filename(checkpoint_dir: str, source_range: Tuple[int, int]) -> str:
+    return os.path.join(checkpoint_dir, "chunk_{}_{}.npy".format(*source_range))
+
+
+def _save_chunk(checkpoint_dir: str, source_range: Tuple[int, int], result: np.ndarray) -> None:
+    # Written aside and renamed, so a chunk interrupted while saving is never read back
+    filename = _chunk_filename(checkpoint_dir, source_range)
+    np.save(filename + ".tmp.npy", result)
+    os.replace(filename + ".tmp.npy", filename)
+
+
+def _open_checkpoint(
+    checkpoint_dir: str, G: CSRGraph, sources: np.ndarray, ranges: List[Tuple[int, int]], task: Callable, resume: bool
+) -> tuple:
+    """
+    Sources, ranges and finished range results of the job checkpointed at `checkpoint_dir`,
+    if resuming the same job on the same graph. Otherwise, start a new checkpoint there
+    """
+    job = {
+        "task": getattr(task, "func", task).__name__,
+        "options": getattr(task, "keywords", {}),
+        "nodes": len(G),
+        "edges": len(G.indices),
+        "sources": len(sources),
+    }
+    job_filename = os.path.join(checkpoint_dir, "job.json")
+
+    if resume and os.path.isfile(job_filename):
+        with open(job_filename, "r") as f:
+            saved = json.load(f)
+
+        if saved["job"] == job:
+            # The saved sources and ranges, as sampled sources or the amount of cores may differ
+            sources = np.load(os.path.join(checkpoint_dir, "sources.npy"))
+            ranges = [tuple(source_range) for source_range in saved["ranges"]]
+            done = {
+                source_range: np.load(_chunk_filename(checkpoint_dir, source_range))
+                for source_range in ranges
+                if os.path.isfile(_chunk_filename(checkpoint_dir, source_range))
+            }
+            print(f"Resuming {job['task']} from {checkpoint_dir}, with {len(done)} of {len(ranges)} ranges done")
+            return sources, ranges, done
+
+        print(f"Checkpoint at {checkpoint_dir} is from another job, starting again")
+
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
+    os.makedirs(checkpoint_dir)
+    np.save(os.path.join(checkpoint_dir, "sources.npy"), sources)
+    with open(job_filename, "w") as f:
+        json.dump({"job": job, "ranges": ranges}, f, indent=4)
+
+    return sources, ranges, {}
+
+
+def sweep_costs(G: CSRGraph, sources: np.ndarray) -> np.ndarray:
+    """
+    Estimated cost of a sweep from each of `sources` over G, from its depth and the edges out
+    of the nodes it reaches. Like `bit_parallel_closeness`, it runs 64 sources per BFS, pulling
+    from the neighbors in G, so G must be reversed, for the sweeps of a directed graph
+    """
+    n = len(G)
+    sources = np.asarray(sources)
+    out_degrees = np.bincount(G.indices, minlength=n).astype(float)
+
+    nonempty = np.flatnonzero(np.diff(G.indptr))
+    starts = G.indptr[nonempty]
+
+    costs = np.zeros(len(sources))
+    seen = np.zeros(n, dtype=np.uint64)
+    frontier = np.zeros(n, dtype=np.uint64)
+    incoming = np.zeros(n, dtype=np.uint64)
+
+    for batch_start in range(0, len(sources), 64):
+        batch = sources[batch_start : batch_start + 64]
+        seen[:] = 0
+        frontier[:] = 0
+        seen[batch] = frontier[batch] = np.left_shift(np.uint64(1), np.arange(len(batch), dtype=np.uint64))
+
+        edges = out_degrees[batch].copy()
+        depth = np.zeros(len(batch))
+        level = 0
+        while True:
+            if nonempty.size:
+                incoming[nonempty] = np.bitwise_or.reduceat(frontier[G.indices], starts)
+            new = incoming & ~seen
+            changed = np.flatnonzero(new)
+            if not changed.size:
+                break
+
+            level += 1
+            seen[changed] |= new[changed]
+            frontier[:] = 0
+            frontier[changed] = new[changed]
+
+            # Edges out of the nodes each source reached in this level
+            bits = np.unpackbits(new[changed].view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")[:, : len(batch)]
+            edges += out_degrees[changed] @ bits
+            depth[bits.any(axis=0)] = level
+
+        costs[batch_start : batch_start + len(batch)] = SOURCE_COST + LEVEL_COST * depth + edges
+
+    return costs
+
+
+def _costs_task(start_end: Tuple[int, int]) -> np.ndarray:
+    start, end = start_end
+    return sweep_costs(_GRAPH, _SOURCES[start:end])
+
+
+def source_costs(G: CSRGraph, sources: np.ndarray, processes: Optional[int] = None, **distributed) -> np.ndarray:
+    """Estimated cost of a (Brandes) sweep over G from each of `sources`"""
+    sources = np.asarray(sources, dtype=np.int32)
+    costs = run_parallel(G.reverse(), sources, _costs_task, len(G), processes, per_source=True, **distributed)
+    return costs[sources]
+
+
+def brandes_dependencies(G: CSRGraph, sources: np.ndarray, distances: bool = False) -> np.ndarray:
+    """
+    Sum over `sources` of the Brandes dependency of every node, that is its
+    unnormalized betweenness when `sources` are all the nodes.
+
+    With `distances`, the same sweep also sums, for every node, how many sources
+    reach it, their distances to it and the inverse of those distances, returning
+    a (4, n) array of dependencies, reached counts, distance sums and harmonic sums
+    """
+    n = len(G)
+    betweenness = np.zeros(n)
+    if distances:
+        reached_by, distance_sums, harmonic_sums = np.zeros(n), np.zeros(n), np.zeros(n)
+    dist = np.full(n, -1, dtype=np.int32)
+    sigma = np.zeros(n)
+    delta = np.zeros(n)
+
+    for source in np.asarray(sources).tolist():
+        dist[source] = 0
+        sigma[source] = 1.0
+        frontier = np.array([source], dtype=np.int32)
+        reached = [frontier]
+        levels = []
+
+        # Forward: shortest paths counts, level by level, keeping the shortest paths DAG edges
+        level = 0
+        while frontier.size:
+            u, w = G.expand(frontier)
+            new = np.unique(w[dist[w] < 0])
+            dist[new] = level + 1
+            if distances:
+                reached_by[new] += 1
+                distance_sums[new] += level + 1
+                harmonic_sums[new] += 1.0 / (level + 1)
+
+            on_path = dist[w] == level + 1
+            u, w = u[on_path], w[on_path]
+            if w.size:
+                targets, inverse = np.unique(w, return_inverse=True)
+                sigma[targets] += np.bincount(inverse, weights=sigma[u])
+            levels.append((u, w))
+
+            frontier = new
+            reached.append(new)
+            level += 1
+
+        # Backward: dependencies, from the farthest level to the source
+        for u, w in reversed(levels):
+            if u.size:
+                predecessors, inverse = np.unique(u, return_inverse=True)
+                delta[predecessors] += np.bincount(inverse, weights=sigma[u] / sigma[w] * (1.0 + delta[w]))
+
+        reached = np.concatenate(reached)
+        betweenness[reached] += delta[reached]
+        betweenness[source] -= delta[source]
+
+        # Reset only what this source touched
+        dist[reached] = -1
+        sigma[reached] = 0.0
+        delta[reached] = 0.0
+
+    if distances:
+        return np.stack([betweenness, reached_by, distance_sums, harmonic_sums])
+    return betweenness
+
+
+def _betweenness_task(start_end: Tuple[int, int]) -> np.ndarray:
+    start, end = start_end
+    return brandes_dependencies(_GRAPH, _SOURCES[start:end])
+
+
+def betweenness(
+    G: CSRGraph,
+    sources: np.ndarray = None,
+    processes: Optional[int] = None,
+    checkpoint_dir: Optional[str] = None,
+    resume: bool = False,
+    address: Optional[str] = None,
+    shared_dir: Optional[str] = None,
+) -> np.ndarray:
+    """
+    Betweenness of every node of G, normalized like `nx.betweenness_centrality`.
+    With `sources`, only their dependencies are summed, scaled by n / len(sources)
+    """
+    n = len(G)
+    sources = np.arange(n) if sources is None else sources
+
+    scores = run_parallel(
+        G,
+        sources,
+        _betweenness_task,
+        n,
+        processes,
+        costs=source_costs(G, sources, processes, address=address, shared_dir=shared_dir),
+        checkpoint_dir=checkpoint_dir,
+        resume=resume,
+        address=address,
+        shared_dir=shared_dir,
+    )
+
+    if n > 2:
+        scores *= 1.0 / ((n - 1) * (n - 2))
+    if 0 < len(sources) < n:
+        scores *= n / len(sources)
+    return scores
+
+
+def _fused_task(start_end: Tuple[int, int]) -> np.ndarray:
+    start, end = start_end
+    return brandes_dependencies(_GRAPH, _SOURCES[start:end], distances=True)
+
+
+def fused_centralities(
+    G: CSRGraph,
+    processes: Optional[int] = None,
+    wf_improved: bool = True,
+    checkpoint_dir: Optional[str] = None,
+    resume: bool = False,
+    address: Optional[str] = None,
+    shared_dir: Optional[str] = None,
+) -> dict:
+    """
+    Betweenness, closeness and harmonic centrality of every node of G, from a single
+    shortest paths sweep per source. A sweep from every source also gives, for every
+    node, the distances from every other node to it, which is what closeness and
+    harmonic centrality measure for directed graphs (as networkx does, reversing G)
+    """
+    n = len(G)
+    sources = np.arange(n)
+    betweenness, reached_by, distance_sums, harmonic_sums = run_parallel(
+        G,
+        sources,
+        _fused_task,
+        (4, n),
+        processes,
+        costs=source_costs(G, sources, processes, address=address, shared_dir=shared_dir),
+        checkpoint_dir=checkpoint_dir,
+        resume=resume,
+        address=address,
+        shared_dir=shared_dir,
+    )
+
+    if n > 2:
+        betweenness *= 1.0 / ((n - 1) * (n - 2))
+
+    closeness = np.array(
+        [
+            _closeness_value(reached + 1, total, n, wf_improved)
+            for reached, total in zip(reached_by.tolist(), distance_sums.tolist())
+        ]
+    )
+    return {"betweenness": betweenness, "closeness": closeness, "harmonic": harmonic_sums}
+
+
+def bfs_closeness(G: CSRGraph, sources: np.ndarray, wf_improved: bool = True) -> np.ndarray:
+    """Closeness of each of `sources`, from BFS distances over G (reversed, for directed closeness)"""
+    n = len(G)
+    closeness = np.zeros(len(sources))
+    dist = np.full(n, -1, dtype=np.int32)
+
+    for position, source in enumerate(np.asarray(sources).tolist()):
+        dist[source] = 0
+        frontier = np.array([source], dtype=np.int32)
+        reached = [frontier]
+
+        total, level = 0, 0
+        while frontier.size:
+            _, w = G.expand(frontier)
+            frontier = np.unique(w[dist[w] < 0])
+            level += 1
+            dist[frontier] = level
+            reached.append(frontier)
+            total += level * frontier.size
+
+        reached = np.concatenate(reached)
+        closeness[position] = _closeness_value(len(reached), total, n, wf_improved)
+
+        # Reset only what this source touched
+        dist[reached] = -1
+
+    return closeness
+
+
+def bit_parallel_closeness(G: CSRGraph, sources: np.ndarray, wf_improved: bool = True) -> np.ndarray:
+    """
+    Closeness of each of `sources`, running the BFS of up to 64 of them at once, one
+    bit per source in uint64 words. Each level, a node frontier word is the OR of
+    the words of its neighbors in G: the predecessors in the reversed graph, which
+    is where closeness distances are measured, for directed graphs
+    """
+    n = len(G)
+    sources = np.asarray(sources)
+    closeness = np.zeros(len(sources))
+
+    # Rows without neighbors are skipped, as `reduceat` can't give an empty OR
+    nonempty = np.flatnonzero(np.diff(G.indptr))
+    starts = G.indptr[nonempty]
+
+    seen = np.zeros(n, dtype=np.uint64)
+    frontier = np.zeros(n, dtype=np.uint64)
+    incoming = np.zeros(n, dtype=np.uint64)
+
+    for batch_start in range(0, len(sources), 64):
+        batch = sources[batch_start : batch_start + 64]
+        seen[:] = 0
+        frontier[:] = 0
+        seen[batch] = frontier[batch] = np.left_shift(np.uint64(1), np.arange(len(batch), dtype=np.uint64))
+
+        reached = np.ones(len(batch))
+        total = np.zeros(len(batch))
+        level = 0
+        while True:
+            if nonempty.size:
+                incoming[nonempty] = np.bitwise_or.reduceat(frontier[G.indices], starts)
+            new = incoming & ~seen
+            changed = np.flatnonzero(new)
+            if not changed.size:
+                break
+
+            level += 1
+            seen[changed] |= new[changed]
+            frontier[:] = 0
+            frontier[changed] = new[changed]
+
+            # How many nodes each source reached in this level
+            bits = np.unpackbits(new[changed].view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+            counts = bits.sum(axis=0)[: len(batch)]
+            reached += counts
+            total += level * counts
+
+        for position in range(len(batch)):
+            closeness[batch_start + position] = _closeness_value(reached[position], total[position], n, wf_improved)
+
+    return closeness
+
+
+def _closeness_value(reached: int, total: int, n: int, wf_improved: bool) -> float:
+    """Closeness from the amount of nodes reached (the source included) and their total distance"""
+    if total <= 0 or n <= 1:
+        return 0.0
+
+    closeness = (reached - 1.0) / total
+    if wf_improved:
+        # normalize to number of nodes-1 in connected part
+        closeness *= (reached - 1.0) / (n - 1)
+    return closeness
+
+
+def _closeness_task(start_end: Tuple[int, int], wf_improved: bool = True, bit_parallel: bool = True) -> np.ndarray:
+    start, end = start_end
+    engine = bit_parallel_closeness if bit_parallel else bfs_closeness
+    return engine(_GRAPH, _SOURCES[start:end], wf_improved)
+
+
+def closeness(
+    G: CSRGraph,
+    processes: Optional[int] = None,
+    wf_improved: bool = True,
+    bit_parallel: bool = True,
+    checkpoint_dir: Optional[str] = None,
+    resume: bool = False,
+    address: Optional[str] = None,
+    shared_dir: Optional[str] = None,
+) -> np.ndarray:
+    """
+    Closeness of every node of G, as `nx.closeness_centrality` (incoming distances, for
+    directed G), 64 sources at a time unless not `bit_parallel`
+    """
+    # The bit-parallel BFS pulls from the neighbors in G, which are the predecessors in the
+    # reversed graph, while the single source BFS pushes over the reversed graph itself
+    graph = G if bit_parallel else G.reverse()
+    task = partial(_closeness_task, wf_improved=wf_improved, bit_parallel=bit_parallel)
+    n = len(G)
+    return run_parallel(
+        graph,
+        np.arange(n),
+        task,
+        n,
+        processes,
+        per_source=True,
+        checkpoint_dir=checkpoint_dir,
+        resume=resume,
+        address=address,
+        shared_dir=shared_dir,
+    )
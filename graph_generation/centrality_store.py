@@ -0,0 +1,85 @@
+# Columnar centrality store: the centralities of a graph snapshot, out of its gpickle
+#
+# Ranking the nodes of a yearly graph by one centrality meant unpickling the whole
+# graph, names, edges and all. Instead, `compute_centralities` also saves, for each
+# graph and year, the node ids as one array and every centrality as another (in the
+# same order), plus a small manifest, so rankings and plots `np.load` (mmap) only
+# the columns they need.
+
+# Core imports
+import json
+import os
+from typing import Dict, Hashable, Iterable, List, Optional
+
+# Library imports
+import numpy as np
+
+# Node attributes set by `GenerateGraph.compute_centralities`, each saved as a column
+CENTRALITY_METRICS = ("degree", "indegree", "outdegree", "betweenness", "closeness", "harmonic", "pagerank")
+
+
+class CentralityStore:
+    """Node ids and centrality columns of a graph snapshot, saved in a directory"""
+
+    def __init__(self, path: str, mmap_mode: Optional[str] = "r"):
+        self.path = path
+        self.mmap_mode = mmap_mode
+
+        with open(os.path.join(path, "manifest.json"), "r") as f:
+            self.manifest = json.load(f)
+
+        self.metrics: List[str] = self.manifest["metrics"]
+
+    def __len__(self) -> int:
+        return self.manifest["nodes"]
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.isfile(os.path.join(path, "manifest.json"))
+
+    def node_ids(self) -> np.ndarray:
+        """Id of the node of each row, as ints, or as strings if the graph ones weren't all ints"""
+        return np.load(os.path.join(self.path, "node_ids.npy"), mmap_mode=self.mmap_mode)
+
+    def column(self, metric: str) -> np.ndarray:
+        """Value of `metric` for each row (NaN for nodes without it)"""
+        if metric not in self.metrics:
+            raise KeyError(f"{metric} is not in the centrality store at {self.path}, only {self.metrics}")
+        return np.load(os.path.join(self.path, f"{metric}.npy"), mmap_mode=self.mmap_mode)
+
+    def columns(self, metrics: Iterable[str] = None) -> Dict[str, np.ndarray]:
+        return {metric: self.column(metric) for metric in (self.metrics if metrics is None else metrics)}
+
+    def top(self, metric: str, n: int = None) -> List[tuple]:
+        """(node id, value) of the `n` (or every) nodes with the highest `metric`, highest first"""
+        column = self.column(metric)
+        order = np.argsort(-column, kind="stable")[:n]
+        return list(zip(self.node_ids()[order].tolist(), column[order].tolist()))
+
+    @staticmethod
+    def save(path: str, G, metrics: Iterable[str], **info) -> "CentralityStore":
+        """Save the `metrics` node attributes of G to `path`, along with `info` in the manifest"""
+        os.makedirs(path, exist_ok=True)
+        if CentralityStore.exists(path):
+            os.remove(os.path.join(path, "manifest.json"))
+
+        nodes: List[Hashable] = list(G)
+        if all(isinstance(node, (int, np.integer)) for node in nodes):
+            node_ids = np.array(nodes, dtype=np.int64)
+        else:
+            node_ids = np.array([str(node) for node in nodes], dtype=str)
+        np.save(os.path.join(path, "node_ids.npy"), node_ids)
+
+        attributes = G.nodes
+        metrics = [metric for metric in metrics if any(metric in attributes[node] for node in nodes)]
+        for metric in metrics:
+            column = np.fromiter(
+                (attributes[node].get(metric, np.nan) for node in nodes), dtype=np.float64, count=len(nodes)
+            )
+            np.save(os.path.join(path, f"{metric}.npy"), column)
+
+        # Written last, so an interrupted save is never mistaken for a store
+        with open(os.path.join(path, "manifest.json"), "w") as f:
+            json.dump({"nodes": len(nodes), "metrics": metrics, **info}, f, indent=4)
+
+        return CentralityStore(path)
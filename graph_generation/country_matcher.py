@@ -0,0 +1,186 @@
+# Compiled affiliation -> country matcher
+#
+# Looking only at the text after the last comma of an org, and matching it exactly
+# against `country_replacement.json`, misses most orgs ("Tsinghua University, Beijing
+# 100084"). So, unless that text is itself a replacement key, country names and
+# multi-token keys are compiled into a token trie, and the whole org is scanned
+# once, keeping the rightmost (then longest) match, as the country is usually
+# written at the end of an affiliation. Single-token keys are city and state names,
+# or two letter codes ("de", "in", "ca"...) which are also common words, so they are
+# only looked for in the text after the last comma: the names as any of its words,
+# and the codes only as all of it, like before.
+
+# Core imports
+import json
+import os
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# Library imports
+import numpy as np
+import fire
+
+# Marks the end of a pattern in the trie, with its country as value
+_END = None
+
+# Single-token keys up to this long are abbreviations, only matched as a whole last comma segment
+ABBREVIATION_LENGTH = 3
+
+
+def normalize_org(organization: str) -> str:
+    return organization.replace(".", "").lower().strip()
+
+
+def tokenize(organization: str) -> List[str]:
+    return normalize_org(organization).replace(",", " ").split()
+
+
+class CountryMatcher:
+    """
+    Replacement keys and country names, resolving orgs to countries: an exact key as
+    the last comma segment, then any name in that segment, then any country name or
+    multi-token key in the whole org
+    """
+
+    def __init__(self, replacement: Dict[str, Optional[str]]):
+        # Keys mapped to null are known not to be countries, so they are left out.
+        # Country names go in first, so an explicit replacement key always wins
+        countries = sorted({country for country in replacement.values() if country is not None})
+        keys = [(key, country) for key, country in replacement.items() if country is not None]
+
+        self.exact = {country.lower(): country for country in countries}
+        self.exact.update((normalize_org(key), country) for key, country in keys)
+
+        self.trie, self.segment_trie = {}, {}
+        for country in countries:
+            self._insert(self.trie, tokenize(country), country)
+            self._insert(self.segment_trie, tokenize(country), country)
+        for key, country in keys:
+            tokens = tokenize(key)
+            if len(tokens) > 1:
+                self._insert(self.trie, tokens, country)
+                self._insert(self.segment_trie, tokens, country)
+            elif len(tokens) == 1 and len(tokens[0]) > ABBREVIATION_LENGTH:
+                self._insert(self.segment_trie, tokens, country)
+
+        self.reset_stats()
+
+    def _insert(self, trie: dict, tokens: List[str], country: str) -> None:
+        if not tokens:
+            return
+
+        node = trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node[_END] = country
+
+    def match(self, tokens: List[str], trie: dict = None) -> Optional[str]:
+        """Country of the rightmost (then longest) pattern of `trie` found in `tokens`, if any"""
+        for start in range(len(tokens) - 1, -1, -1):
+            node, country = self.trie if trie is None else trie, None
+            for token in tokens[start:]:
+                node = node.get(token)
+                if node is None:
+                    break
+                country = node.get(_END, country)
+
+            if country is not None:
+                return country
+
+        return None
+
+    def __call__(self, organization: str) -> Tuple[bool, str]:
+        """
+        (True, country) for an org with a known country, otherwise (False, text after
+        its last comma), which is what is written to `missing_countries.json`
+        """
+        last_segment = normalize_org(organization.split(",")[-1])
+
+        country = self.exact.get(last_segment)
+        if country is None:
+            country = self.match(tokenize(last_segment), self.segment_trie)
+        if country is None:
+            country = self.match(tokenize(organization))
+        if country is not None:
+            return (True, country)
+
+        return (False, last_segment)
+
+    def reset_stats(self) -> None:
+        self.stats = Counter()
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def resolve_all(self, org_counts: Dict[str, int]) -> Dict[str, Tuple[bool, str]]:
+        """
+        Resolve each distinct org once, given how many authorships have it,
+        updating the coverage (distinct orgs) and hit-rate (authorships) counters
+        """
+        resolved = {}
+        for organization, occurrences in org_counts.items():
+            found, country = resolved[organization] = self(organization)
+
+            if not organization:
+                self.stats["without_org"] += occurrences
+                continue
+
+            self.stats["distinct"] += 1
+            self.stats["occurrences"] += occurrences
+            if found:
+                self.stats["distinct_found"] += 1
+                self.stats["occurrences_found"] += occurrences
+                self.hits[country] += occurrences
+            else:
+                self.misses[country] += occurrences
+
+        return resolved
+
+    def report(self, top: int = 20) -> None:
+        distinct, occurrences = max(self.stats["distinct"], 1), max(self.stats["occurrences"], 1)
+        print(
+            f"Matched {self.stats['distinct_found']}/{self.stats['distinct']} distinct orgs "
+            f"({self.stats['distinct_found'] / distinct:.1%} coverage), "
+            f"{self.stats['occurrences_found']}/{self.stats['occurrences']} authorships "
+            f"({self.stats['occurrences_found'] / occurrences:.1%} hit rate), "
+            f"{self.stats['without_org']} authorships without org"
+        )
+        print("Most frequent countries", self.hits.most_common(top))
+        print("Most frequent misses", self.misses.most_common(top))
+
+    @staticmethod
+    def load(filename: str = "./country_replacement.json") -> "CountryMatcher":
+        with open(filename, "r") as f:
+            return CountryMatcher(json.load(f))
+
+
+def infer_countries(
+    store_path: str = "../data/paper_store_v13",
+    replacement: str = "./country_replacement.json",
+    missing_output: str = None,
+    top: int = 20,
+) -> None:
+    """
+    Resolve the country of every distinct org in the paper store at STORE_PATH,
+    reporting coverage and hit rate, and optionally saving the misses
+    """
+    from paper_store import PaperStore
+
+    # Configure to current directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    store = PaperStore(store_path)
+    orgs = store.orgs.to_list()
+    counts = np.bincount(store.authors_orgs[store.authors_orgs >= 0], minlength=len(orgs))
+    without_org = int((np.asarray(store.authors_orgs) < 0).sum())
+
+    matcher = CountryMatcher.load(replacement)
+    resolved = matcher.resolve_all({"": without_org, **dict(zip(orgs, counts.tolist()))})
+    matcher.report(top)
+
+    if missing_output is not None:
+        with open(missing_output, "w") as f:
+            json.dump({country: "" for found, country in resolved.values() if not found}, f)
+
+
+if __name__ == "__main__":
+    fire.Fire(infer_countries)
@@ -0,0 +1,91 @@
+# Read-only CSR adjacency of a graph, shared with worker processes through mmap'd files
+#
+# Sending the networkx graph to every centrality chunk pickles it 4 x cores times,
+# and every worker keeps its own copy. Instead, the adjacency is written once as
+# int arrays (`indptr`, `indices`) to a directory, and workers `np.load` them with
+# `mmap_mode="r"`: every process reads the same pages, so there is a single copy
+# of the graph in memory, and tasks only carry ranges of source positions.
+
+# Core imports
+import json
+import os
+from typing import Hashable, List
+
+# Library imports
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+
+
+class CSRGraph:
+    """
+    Adjacency of a graph over the positions of its nodes: the neighbors (successors,
+    for directed graphs) of node `i` are `indices[indptr[i]:indptr[i + 1]]`.
+    Parallel edges are kept once, as networkx shortest paths see them
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, directed: bool, nodes: List[Hashable] = None):
+        self.indptr = indptr
+        self.indices = indices
+        self.directed = directed
+        self.nodes = nodes
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    @staticmethod
+    def from_networkx(G: nx.Graph) -> "CSRGraph":
+        nodes = list(G)
+        position = {node: index for index, node in enumerate(nodes)}
+
+        src = np.fromiter((position[u] for u, _ in G.edges()), dtype=np.int32, count=G.number_of_edges())
+        dst = np.fromiter((position[v] for _, v in G.edges()), dtype=np.int32, count=G.number_of_edges())
+        if not G.is_directed():
+            src, dst = np.concatenate([src, dst]), np.concatenate([dst, src])
+
+        n = len(nodes)
+        A = sp.csr_matrix((np.ones(len(src), dtype=np.int8), (src, dst)), shape=(n, n))
+        A.sum_duplicates()
+
+        return CSRGraph(A.indptr.astype(np.int64), A.indices.astype(np.int32), G.is_directed(), nodes)
+
+    def as_scipy(self) -> sp.csr_matrix:
+        """Adjacency matrix of the graph, sharing its arrays"""
+        n = len(self)
+        return sp.csr_matrix((np.ones(len(self.indices), dtype=np.int8), self.indices, self.indptr), shape=(n, n))
+
+    def reverse(self) -> "CSRGraph":
+        """Same graph with every edge reversed (predecessors instead of successors)"""
+        if not self.directed:
+            return self
+
+        T = self.as_scipy().T.tocsr()
+        T.sort_indices()
+        return CSRGraph(T.indptr.astype(np.int64), T.indices.astype(np.int32), True, self.nodes)
+
+    def expand(self, frontier: np.ndarray):
+        """Every edge out of the `frontier` nodes, as (source, neighbor) arrays"""
+        starts = self.indptr[frontier]
+        counts = self.indptr[frontier + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return np.repeat(frontier, counts), self.indices[offsets]
+
+    def save(self, path: str) -> None:
+        """Write the adjacency arrays to `path`, to be loaded (mmap'd) by workers"""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "indptr.npy"), self.indptr)
+        np.save(os.path.join(path, "indices.npy"), self.indices)
+        with open(os.path.join(path, "csr.json"), "w") as f:
+            json.dump({"nodes": len(self), "edges": len(self.indices), "directed": self.directed}, f)
+
+    @staticmethod
+    def load(path: str, mmap_mode: str = "r") -> "CSRGraph":
+        """Load the adjacency saved at `path`, without node ids"""
+        with open(os.path.join(path, "csr.json"), "r") as f:
+            manifest = json.load(f)
+
+        return CSRGraph(
+            np.load(os.path.join(path, "indptr.npy"), mmap_mode=mmap_mode),
+            np.load(os.path.join(path, "indices.npy"), mmap_mode=mmap_mode),
+            manifest["directed"],
+        )
@@ -0,0 +1,160 @@
+# Parallel, sharded ingest of the DBLP arnet dump
+#
+# The dump is split in byte ranges which always start at the beginning of a
+# record, so each worker can decode its own range independently. Records start
+# at the beginning of a line with a `{`, both in the v12+ JSON array dumps (where
+# nested objects are indented) and in the one-object-per-line v11 dump.
+
+# Core imports
+import codecs
+import json
+import os
+from multiprocessing import Pool
+from typing import Iterator, List, Optional, Tuple
+
+# Library imports
+from tqdm import tqdm
+
+from venue_classifier import VenueFilter
+
+RECORD_START = b"\n{"
+BLOCK_SIZE = 8 * 1024 * 1024
+
+
+def _next_record_start(f, position: int) -> int:
+    """Find the first record start at or after `position`, or the end of the file"""
+    f.seek(position - 1)
+    offset = f.tell()
+    tail = b""
+    while True:
+        block = f.read(BLOCK_SIZE)
+        if not block:
+            return offset + len(tail)
+
+        buffer = tail + block
+        found = buffer.find(RECORD_START)
+        if found >= 0:
+            return offset + found + 1
+
+        # Keep the last byte, in case the separator was split between blocks
+        offset += len(buffer) - 1
+        tail = buffer[-1:]
+
+
+def find_shard_boundaries(filename: str, n_shards: int) -> List[Tuple[int, int]]:
+    """Split `filename` in (up to) `n_shards` byte ranges aligned to record boundaries"""
+    size = os.path.getsize(filename)
+
+    # The first shard always starts at the beginning, skipping the opening `[` when decoding.
+    # If no record boundary can be found (e.g. a minified dump) it is the only shard
+    with open(filename, "rb") as f:
+        starts = sorted({0} | {_next_record_start(f, (size * shard) // n_shards) for shard in range(1, n_shards)})
+
+    return [(start, end) for start, end in zip(starts, starts[1:] + [size]) if start < end]
+
+
+def iter_shard_records(filename: str, start: int, end: int, with_offsets: bool = False) -> Iterator[dict]:
+    """
+    Decode every record in the byte range [start, end) of `filename`.
+    With `with_offsets`, yield (byte offset, record) tuples instead
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+
+    with open(filename, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        buffer = ""
+        position = 0
+
+        # Byte offset of `buffer[position]`, only tracked when needed
+        byte_position = start
+
+        while True:
+            block = f.read(min(BLOCK_SIZE, remaining))
+            remaining -= len(block)
+            buffer = buffer[position:] + text_decoder.decode(block, final=not block)
+            position = 0
+
+            while True:
+                # Skip whatever separates records in the dump
+                record_start = position
+                while position < len(buffer) and buffer[position] in " \t\r\n,[]":
+                    position += 1
+                if position >= len(buffer):
+                    position = record_start
+                    break
+
+                try:
+                    record, position_after = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if not block:
+                        raise
+                    position = record_start
+                    break  # Incomplete record, read some more
+
+                if with_offsets:
+                    # Separators are ASCII, so they are one byte each
+                    byte_position += position - record_start
+                    yield byte_position, record
+                    byte_position += len(buffer[position:position_after].encode("utf-8"))
+                else:
+                    yield record
+
+                position = position_after
+
+            if not block:
+                return
+
+
+def _read_shard(filename_start_end_conference_ids: tuple) -> Tuple[dict, int, int]:
+    """
+    Decode a shard keeping only the papers in `conference_ids`, returning the
+    year-keyed papers plus the amount of records read and of errors found
+    """
+    # Imported here, as generate_graph imports this module
+    from generate_graph import GenerateGraph
+
+    filename, start, end, conference_ids = filename_start_end_conference_ids
+    venue_filter = None if conference_ids is None else VenueFilter(conference_ids)
+
+    conference_papers = {}
+    total, errors = 0, 0
+    for line in iter_shard_records(filename, start, end):
+        total += 1
+        try:
+            if venue_filter is None or venue_filter(line["venue"]["raw"]):
+                conference_papers.setdefault(line["year"], []).append(GenerateGraph.get_data(line))
+        except KeyError:
+            errors += 1
+
+    return conference_papers, total, errors
+
+
+def read_dblp_parallel(
+    filename: str,
+    conference_ids: Optional[List[str]] = None,
+    processes: Optional[int] = None,
+    shards_per_process: int = 4,
+) -> dict:
+    """
+    Read the DBLP dump in parallel, returning the same year-keyed
+    `conference_papers` dict as `GenerateGraph.read_from_dblp`
+    """
+    processes = processes or os.cpu_count()
+    shards = find_shard_boundaries(filename, processes * shards_per_process)
+    print(f"Reading {filename} in {len(shards)} shards in {processes} cores")
+
+    conference_papers = {}
+    total, errors = 0, 0
+    with Pool(processes=processes) as pool:
+        # `imap` keeps the shards order, so papers keep the order of the dump
+        tasks = [(filename, start, end, conference_ids) for start, end in shards]
+        for shard_papers, shard_total, shard_errors in tqdm(pool.imap(_read_shard, tasks), total=len(tasks)):
+            for year, papers in shard_papers.items():
+                conference_papers.setdefault(year, []).extend(papers)
+            total += shard_total
+            errors += shard_errors
+
+    print(f"Read {total} papers ({errors} errors), kept {sum(map(len, conference_papers.values()))}")
+    return conference_papers
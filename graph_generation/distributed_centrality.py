@@ -0,0 +1,331 @@
+# Centrality source ranges served to workers on other hosts, over TCP
+#
+# Exact betweenness on the full-dump graphs doesn't fit one machine, but its source
+# ranges are independent. With an `address`, `centrality_engine.run_parallel` doesn't
+# start a local pool: it serves the job (where the `CSRGraph` was saved, and the task)
+# with a `multiprocessing` manager, and workers started on any host with access to that
+# path (e.g. an NFS mount, given as `shared_dir`) pull ranges from it and push back
+# their partial vectors, merged as in a local run. Workers outlive jobs, so one fleet
+# serves every centrality of every year. A range is leased to the worker it is handed
+# out to, which renews the lease while it runs it. Once every range was handed out,
+# those whose lease expired are handed out again, so a worker that died doesn't stall
+# the job, while ranges still being run are not run twice. Ranges are sized for the
+# number of workers in all hosts, which the coordinator can't know, so it is given as
+# `processes` to the centrality functions. A range failing in a worker fails the job
+# with its traceback, and so does no worker being heard from for a while.
+#
+# Connections are authenticated with a key shared by the coordinator and the workers,
+# given as `authkey` or in the CENTRALITY_AUTHKEY environment variable; there is no
+# default one, as workers unpickle whatever the coordinator sends them. Given just a
+# port, the coordinator only listens on localhost: to serve other hosts, its address
+# must name the interface to listen on (e.g. "0.0.0.0:port" for every one).
+#
+# Coordinator: pass `address="host:port"` to the centrality functions
+# Workers:     CENTRALITY_AUTHKEY=... python distributed_centrality.py --address host:port --processes 8
+
+# Core imports
+import collections
+import contextlib
+import os
+import queue
+import threading
+import time
+import traceback
+from multiprocessing import Process
+from multiprocessing.managers import BaseManager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# Library imports
+import fire
+import numpy as np
+
+# Host served at when the address is only a port
+DEFAULT_HOST = "127.0.0.1"
+
+# Seconds a range stays leased to its worker unless renewed, which it is every third of it
+LEASE = 60.0
+
+# Seconds without hearing from any worker after which a job fails
+WORKER_TIMEOUT = 600.0
+
+
+def parse_address(address) -> Tuple[str, int]:
+    """("host", port) of a "host:port" string (or tuple), or of a port, on `DEFAULT_HOST`"""
+    if isinstance(address, int):
+        return DEFAULT_HOST, address
+    if isinstance(address, str):
+        host, _, port = address.rpartition(":")
+        return host or DEFAULT_HOST, int(port)
+    host, port = address
+    return host, int(port)
+
+
+def resolve_authkey(authkey: Optional[str] = None) -> bytes:
+    """The key given, or else the CENTRALITY_AUTHKEY environment variable one"""
+    authkey = authkey or os.environ.get("CENTRALITY_AUTHKEY")
+    if not authkey:
+        raise ValueError("Distributed centralities need a shared key, set CENTRALITY_AUTHKEY or pass an authkey")
+    return authkey.encode()
+
+
+class Coordinator:
+    """Source ranges of the current job, leased to workers, and their results"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.job_id = 0
+        self.job_info = None
+        self.lease = LEASE
+        self.pending = collections.deque()
+        self.leases = collections.OrderedDict()
+        self.missing = set()
+        self.results = queue.Queue()
+        self.last_seen = time.time()
+
+    def start_job(self, path: str, task: Callable, ranges: List[Tuple[int, int]], lease: float = LEASE) -> int:
+        with self.lock:
+            self.job_id += 1
+            self.job_info = (self.job_id, path, task, lease)
+            self.lease = lease
+            self.pending = collections.deque(ranges)
+            self.leases = collections.OrderedDict()
+            self.missing = set(ranges)
+            self.results = queue.Queue()
+            self.last_seen = time.time()
+            return self.job_id
+
+    def finish_job(self) -> None:
+        with self.lock:
+            self.job_info = None
+            self.pending.clear()
+            self.leases.clear()
+            self.missing.clear()
+
+    def job(self) -> Optional[tuple]:
+        """(id, graph path, task, lease) of the current job, if any"""
+        self.last_seen = time.time()
+        return self.job_info
+
+    def next_range(self, job_id: int) -> Optional[Tuple[int, int]]:
+        """A range of `job_id` not handed out yet, or whose lease expired, if any"""
+        with self.lock:
+            self.last_seen = time.time()
+            if job_id != self.job_id or self.job_info is None:
+                return None
+
+            # Leases are kept oldest first, so only the first one can have expired first
+            if self.pending:
+                source_range = self.pending.popleft()
+            else:
+                source_range = next(iter(self.leases), None)
+                if source_range is None or self.leases[source_range] > time.time():
+                    return None
+
+            self.leases.pop(source_range, None)
+            self.leases[source_range] = time.time() + self.lease
+            return source_range
+
+    def renew(self, job_id: int, source_range: Tuple[int, int]) -> None:
+        """Extend the lease of a range still being run"""
+        with self.lock:
+            self.last_seen = time.time()
+            if job_id == self.job_id and source_range in self.leases:
+                self.leases.move_to_end(source_range)
+                self.leases[source_range] = time.time() + self.lease
+
+    def put_result(self, job_id: int, source_range: Tuple[int, int], result: np.ndarray) -> None:
+        with self.lock:
+            self.last_seen = time.time()
+            if job_id != self.job_id or source_range not in self.missing:
+                return  # Of a previous job, or already done by another worker
+            self.missing.discard(source_range)
+            self.leases.pop(source_range, None)
+            self.results.put((source_range, result, None))
+
+    def put_error(self, job_id: int, source_range: Tuple[int, int], error: str) -> None:
+        """Report that running `source_range` raised, with the `error` traceback"""
+        with self.lock:
+            self.last_seen = time.time()
+            if job_id == self.job_id and source_range in self.missing:
+                self.results.put((source_range, None, error))
+
+    def wait_result(self, timeout: Optional[float] = WORKER_TIMEOUT) -> Tuple[Tuple[int, int], np.ndarray]:
+        """
+        The next (range, result) done, raising RuntimeError if a worker failed running a range,
+        or TimeoutError if no worker was heard from in `timeout` seconds (as they renew their
+        leases while running ranges, that means they are all gone)
+        """
+        while True:
+            try:
+                source_range, result, error = self.results.get(timeout=1.0)
+            except queue.Empty:
+                if timeout is not None and time.time() - self.last_seen > timeout:
+                    raise TimeoutError(f"No centrality worker was heard from in {timeout:.0f} seconds")
+                continue
+
+            if error is not None:
+                raise RuntimeError(f"Source range {source_range} failed in a worker:\n{error}")
+            return source_range, result
+
+
+class CoordinatorManager(BaseManager):
+    pass
+
+
+CoordinatorManager.register("coordinator")
+
+# Coordinator served by this process at each address, started by `serve`
+_COORDINATORS: Dict[Tuple[str, int], Coordinator] = {}
+
+
+def serve(address, authkey: Optional[str] = None) -> Coordinator:
+    """The coordinator served at `address`, starting to serve it from this process if it isn't yet"""
+    address = parse_address(address)
+    if address not in _COORDINATORS:
+        coordinator = Coordinator()
+
+        class ServingManager(BaseManager):
+            pass
+
+        ServingManager.register("coordinator", callable=lambda: coordinator)
+        server = ServingManager(address=address, authkey=resolve_authkey(authkey)).get_server()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        print(f"Serving centrality jobs to workers at {address[0]}:{address[1]}")
+        _COORDINATORS[address] = coordinator
+
+    return _COORDINATORS[address]
+
+
+def run_distributed(
+    address,
+    path: str,
+    task: Callable,
+    ranges: List[Tuple[int, int]],
+    authkey: Optional[str] = None,
+    lease: float = LEASE,
+    timeout: Optional[float] = WORKER_TIMEOUT,
+) -> Iterator[Tuple[Tuple[int, int], np.ndarray]]:
+    """
+    Serve the `ranges` of `task` over the graph saved at `path` to the workers connected to
+    `address`, yielding (range, result) for each of them once, as their results arrive.
+    A range is handed out again if its worker doesn't renew its lease for `lease` seconds,
+    and the job fails if a range fails, or no worker is heard from in `timeout` seconds
+    """
+    coordinator = serve(address, authkey)
+    coordinator.start_job(path, task, ranges, lease)
+    return _results(coordinator, len(ranges), timeout)
+
+
+def _results(
+    coordinator: Coordinator, n_results: int, timeout: Optional[float]
+) -> Iterator[Tuple[Tuple[int, int], np.ndarray]]:
+    try:
+        for _ in range(n_results):
+            yield coordinator.wait_result(timeout)
+    finally:
+        coordinator.finish_job()
+
+
+def connect(address, authkey: Optional[str] = None, wait: float = 60.0):
+    """Proxy of the coordinator at `address`, waiting up to `wait` seconds for it to be served"""
+    authkey = resolve_authkey(authkey)
+    deadline = time.time() + wait
+    while True:
+        manager = CoordinatorManager(address=parse_address(address), authkey=authkey)
+        try:
+            manager.connect()
+            return manager.coordinator()
+        except ConnectionError:
+            if time.time() > deadline:
+                raise
+            time.sleep(1.0)
+
+
+@contextlib.contextmanager
+def renewing(coordinator, job_id: int, source_range: Tuple[int, int], lease: float):
+    """Renew the lease of `source_range` from another thread, until exiting"""
+    stop = threading.Event()
+
+    def renew() -> None:
+        while not stop.wait(lease / 3):
+            try:
+                coordinator.renew(job_id, source_range)
+            except (EOFError, ConnectionError):
+                return
+
+    thread = threading.Thread(target=renew, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def work_loop(address, authkey: Optional[str] = None, wait: float = 60.0, poll_interval: float = 0.5) -> int:
+    """
+    Run the ranges handed out by the coordinator at `address` until it goes away,
+    returning how many ranges were run
+    """
+    # Imported here, as the engine imports this module for its distributed runs
+    import centrality_engine
+
+    coordinator = connect(address, authkey, wait)
+    attached_job, done = None, 0
+    while True:
+        try:
+            job = coordinator.job()
+            source_range = coordinator.next_range(job[0]) if job is not None else None
+            if source_range is None:
+                time.sleep(poll_interval)
+                continue
+
+            job_id, path, task, lease = job
+            with renewing(coordinator, job_id, source_range, lease):
+                try:
+                    if attached_job != job_id:
+                        centrality_engine._attach(path)
+                        attached_job = job_id
+                    result = task(source_range)
+                except Exception:
+                    # Reported to the coordinator, which fails the job with it
+                    attached_job = None
+                    coordinator.put_error(job_id, source_range, traceback.format_exc())
+                    continue
+
+            coordinator.put_result(job_id, source_range, result)
+            done += 1
+        except (EOFError, ConnectionError):
+            # The coordinator finished
+            return done
+
+
+def work(address: str, authkey: str = None, processes: int = None, wait: float = 60.0) -> None:
+    """
+    Start `processes` workers (every core, by default) of the
+    coordinator at `address`, and wait for it to finish
+
+    Arguments:
+
+        address (str): "host:port" the coordinator serves at
+
+        authkey (str): Key shared with the coordinator, by default
+            the CENTRALITY_AUTHKEY environment variable (required)
+
+        processes (int): Worker processes in this host
+
+        wait (float): Seconds to wait for the coordinator to start
+    """
+    resolve_authkey(authkey)  # Before starting any process without it
+
+    processes = processes or os.cpu_count()
+    workers = [Process(target=work_loop, args=(address, authkey, wait)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    fire.Fire(work)
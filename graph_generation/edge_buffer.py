@@ -0,0 +1,291 @@
+# Bulk graph construction from year-stamped edge arrays
+#
+# Calling `add_node`/`add_edge` with keyword attributes millions of times is what
+# most of the generation time goes to. Generators instead emit nodes and edges into
+# this buffer (growable numpy arrays of src, dst, year and attributes), the edges of
+# a year at once, and graphs are materialized from it, in bulk, only when a snapshot
+# is needed: one `add_edges_from` per year and attributes, passed once as keywords
+# instead of as a dict per edge. Materialized edges keep the `year` they were (last)
+# logged in, and the graph of a single year is materialized from only its part of
+# the log (see `mark_at`).
+
+# Core imports
+import json
+import os
+import pickle
+from typing import Hashable, Iterator, List, Optional, Tuple
+
+# Library imports
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+
+# Data of the pairs not in the graph yet, whose weight is only the one logged
+_NO_EDGE = {"weight": 0}
+
+
+def _groups(keys: np.ndarray) -> Iterator[Tuple[int, np.ndarray]]:
+    """(key, positions) of each distinct value in `keys`, in increasing order of key"""
+    if not len(keys):
+        return
+
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    bounds = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1], True])
+    for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        yield int(sorted_keys[start]), order[start:end]
+
+
+class EdgeBuffer:
+    """
+    Year-stamped log of nodes and edges. Nodes are interned to local int indexes,
+    and edge attributes to an index in `self.attributes`, so every edge is just
+    four ints: (src, dst, year, attributes)
+
+    A `weighted` buffer also keeps an int weight (a count) per edge, and materializes
+    each pair once, adding its weights to the `weight` attribute of the edge in the graph
+    """
+
+    def __init__(self, capacity: int = 1 << 16, weighted: bool = False):
+        self.weighted = weighted
+
+        self.nodes: List[Hashable] = []
+        self.node_index = {}
+        self.node_attributes: List[dict] = []
+        self.node_events: List[int] = []
+
+        self.attributes: List[dict] = []
+        self.attributes_index = {}
+
+        self.size = 0
+        self.src = np.empty(capacity, dtype=np.int32)
+        self.dst = np.empty(capacity, dtype=np.int32)
+        self.year = np.empty(capacity, dtype=np.int16)
+        self.edge_attributes = np.empty(capacity, dtype=np.int32)
+        self.weight = np.empty(capacity if weighted else 0, dtype=np.int64)
+
+        # (year, mark) at the end of each year, so the log can be replayed up to any year
+        self.year_marks: List[Tuple[int, Tuple[int, int]]] = []
+
+    def __len__(self) -> int:
+        return self.size
+
+    def mark(self) -> Tuple[int, int]:
+        """Position in the log, to materialize only what comes after it"""
+        return len(self.node_events), self.size
+
+    def end_year(self, year: int) -> None:
+        """Record that everything logged so far belongs to `year`, or an earlier one"""
+        self.year_marks.append((year, self.mark()))
+
+    def mark_at(self, year: int) -> Tuple[int, int]:
+        """Mark at the end of `year`, to materialize the graph as it was then"""
+        mark = (0, 0)
+        for mark_year, year_mark in self.year_marks:
+            if mark_year > year:
+                break
+            mark = year_mark
+        return mark
+
+    def local(self, node: Hashable) -> int:
+        """Local index of `node`, interning it if needed"""
+        index = self.node_index.get(node)
+        if index is None:
+            index = self.node_index[node] = len(self.nodes)
+            self.nodes.append(node)
+            self.node_attributes.append({})
+        return index
+
+    def add_node(self, node: Hashable, **attributes) -> int:
+        """Log `node`, updating its attributes like `nx.Graph.add_node` would"""
+        index = self.local(node)
+        if attributes:
+            self.node_attributes[index].update(attributes)
+        self.node_events.append(index)
+        return index
+
+    def attributes_id(self, attributes: dict) -> int:
+        """Index of an edge attributes dict, shared by every edge with the same attributes"""
+        if not attributes:
+            return -1
+
+        key = tuple(sorted(attributes.items()))
+        index = self.attributes_index.get(key)
+        if index is None:
+            index = self.attributes_index[key] = len(self.attributes)
+            self.attributes.append(dict(attributes))
+        return index
+
+    def _reserve(self, extra: int) -> None:
+        needed = self.size + extra
+        if needed <= len(self.src):
+            return
+
+        capacity = max(needed, 2 * len(self.src))
+        for column in ("src", "dst", "year", "edge_attributes") + (("weight",) if self.weighted else ()):
+            grown = np.empty(capacity, dtype=getattr(self, column).dtype)
+            grown[: self.size] = getattr(self, column)[: self.size]
+            setattr(self, column, grown)
+
+    def add_edge(self, u: Hashable, v: Hashable, year: int, attributes: int = -1, weight: int = 1) -> None:
+        """Log an edge, with `attributes` as returned by `attributes_id`"""
+        self._reserve(1)
+        self.src[self.size] = self.local(u)
+        self.dst[self.size] = self.local(v)
+        self.year[self.size] = year
+        self.edge_attributes[self.size] = attributes
+        if self.weighted:
+            self.weight[self.size] = weight
+        self.size += 1
+
+    def add_edges(
+        self, src: np.ndarray, dst: np.ndarray, year: int, attributes: int = -1, weights: np.ndarray = None
+    ) -> None:
+        """Log many edges at once (arrays or lists), with endpoints already given as local indexes"""
+        count = len(src)
+        self._reserve(count)
+        self.src[self.size : self.size + count] = src
+        self.dst[self.size : self.size + count] = dst
+        self.year[self.size : self.size + count] = year
+        self.edge_attributes[self.size : self.size + count] = attributes
+        if self.weighted:
+            self.weight[self.size : self.size + count] = 1 if weights is None else weights
+        self.size += count
+
+    def materialize(
+        self, G: nx.Graph, since: Tuple[int, int] = (0, 0), until: Optional[Tuple[int, int]] = None
+    ) -> nx.Graph:
+        """
+        Add every node and edge logged between the `since` and `until` marks to G, in bulk,
+        stamping each edge with the `year` it was (last) logged in
+        """
+        node_start, edge_start = since
+        node_end, edge_end = until if until is not None else self.mark()
+
+        node_indexes = dict.fromkeys(self.node_events[node_start:node_end])
+        G.add_nodes_from((self.nodes[index], self.node_attributes[index]) for index in node_indexes)
+
+        if self.weighted:
+            return self._materialize_weighted(G, edge_start, edge_end)
+
+        # Edges of each year and attributes go at once, later years last, so they win
+        node_of = self.nodes.__getitem__
+        src, dst = self.src[edge_start:edge_end], self.dst[edge_start:edge_end]
+        width = len(self.attributes) + 1
+        keys = self.year[edge_start:edge_end].astype(np.int64) * width + self.edge_attributes[edge_start:edge_end] + 1
+        for key, positions in _groups(keys):
+            year, attributes = divmod(key, width)
+            attributes = {**(self.attributes[attributes - 1] if attributes else {}), "year": year}
+            pairs = zip(map(node_of, src[positions].tolist()), map(node_of, dst[positions].tolist()))
+
+            # Multigraphs `add_edges_from` updates each new edge again through views, so `add_edge` is faster
+            if G.is_multigraph():
+                add_edge = G.add_edge
+                for u, v in pairs:
+                    add_edge(u, v, **attributes)
+            else:
+                G.add_edges_from(pairs, **attributes)
+
+        return G
+
+    def _materialize_weighted(self, G: nx.Graph, edge_start: int, edge_end: int) -> nx.Graph:
+        """Sum the weights logged for each pair, with the one it has in G, then set them in bulk"""
+        if edge_start >= edge_end:
+            return G
+
+        # Group the edges by pair, sorted by year within each pair (both directions are one edge if undirected)
+        n = len(self.nodes)
+        src, dst = self.src[edge_start:edge_end], self.dst[edge_start:edge_end]
+        if not G.is_directed():
+            src, dst = np.minimum(src, dst), np.maximum(src, dst)
+        pair = src.astype(np.int64) * n + dst
+        year = self.year[edge_start:edge_end]
+        order = np.lexsort((year, pair))
+        pair, year, weight = pair[order], year[order], self.weight[edge_start:edge_end][order]
+
+        starts = np.flatnonzero(np.r_[True, pair[1:] != pair[:-1]])
+        weights = np.add.reduceat(weight, starts)
+        last_years = year[np.r_[starts[1:], len(pair)] - 1]
+
+        node_of = self.nodes.__getitem__
+        us = list(map(node_of, (pair[starts] // n).tolist()))
+        vs = list(map(node_of, (pair[starts] % n).tolist()))
+
+        # The weights the pairs already have in G are folded in, so every pair is just set
+        get_edge_data = G.get_edge_data
+        weights += np.fromiter(
+            (get_edge_data(u, v, _NO_EDGE)["weight"] for u, v in zip(us, vs)), dtype=np.int64, count=len(us)
+        )
+
+        # Pairs last logged in the same year go at once
+        for year, positions in _groups(last_years):
+            positions = positions.tolist()
+            G.add_weighted_edges_from(
+                zip(map(us.__getitem__, positions), map(vs.__getitem__, positions), weights[positions].tolist()),
+                year=year,
+            )
+
+        return G
+
+    def nodes_between(self, since: Tuple[int, int], until: Tuple[int, int]) -> set:
+        """Nodes logged, or used by an edge logged, between the `since` and `until` marks"""
+        (node_start, edge_start), (node_end, edge_end) = since, until
+
+        indexes = set(self.node_events[node_start:node_end])
+        indexes.update(self.src[edge_start:edge_end].tolist())
+        indexes.update(self.dst[edge_start:edge_end].tolist())
+        return {self.nodes[index] for index in indexes}
+
+    def to_csr(self, max_year: int = None, min_year: int = None) -> sp.csr_matrix:
+        """
+        Adjacency matrix over the local node indexes, with the amount (or total weight)
+        of edges between each pair, optionally only with the edges in [min_year, max_year]
+        """
+        mask = np.ones(self.size, dtype=bool)
+        if max_year is not None:
+            mask &= self.year[: self.size] <= max_year
+        if min_year is not None:
+            mask &= self.year[: self.size] >= min_year
+
+        src, dst = self.src[: self.size][mask], self.dst[: self.size][mask]
+        weights = self.weight[: self.size][mask] if self.weighted else np.ones(len(src), dtype=np.int32)
+
+        n = len(self.nodes)
+        return sp.csr_matrix((weights, (src, dst)), shape=(n, n))
+
+    def save(self, path: str) -> None:
+        """Save the log to `path`: its arrays as .npy files, nodes and attributes pickled"""
+        os.makedirs(path, exist_ok=True)
+
+        columns = ("src", "dst", "year", "edge_attributes") + (("weight",) if self.weighted else ())
+        for column in columns:
+            np.save(os.path.join(path, f"{column}.npy"), getattr(self, column)[: self.size])
+        np.save(os.path.join(path, "node_events.npy"), np.array(self.node_events, dtype=np.int32))
+
+        with open(os.path.join(path, "nodes.pickle"), "wb") as f:
+            pickle.dump((self.nodes, self.node_attributes, self.attributes), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        with open(os.path.join(path, "log.json"), "w") as f:
+            json.dump({"weighted": self.weighted, "size": self.size, "year_marks": self.year_marks}, f)
+
+    @staticmethod
+    def load(path: str) -> "EdgeBuffer":
+        """Load a log saved with `save`"""
+        with open(os.path.join(path, "log.json"), "r") as f:
+            log = json.load(f)
+
+        edges = EdgeBuffer(capacity=0, weighted=log["weighted"])
+        for column in ("src", "dst", "year", "edge_attributes") + (("weight",) if edges.weighted else ()):
+            setattr(edges, column, np.load(os.path.join(path, f"{column}.npy")))
+        edges.size = log["size"]
+        edges.year_marks = [(year, tuple(mark)) for year, mark in log["year_marks"]]
+        edges.node_events = np.load(os.path.join(path, "node_events.npy")).tolist()
+
+        with open(os.path.join(path, "nodes.pickle"), "rb") as f:
+            edges.nodes, edges.node_attributes, edges.attributes = pickle.load(f)
+        edges.node_index = {node: index for index, node in enumerate(edges.nodes)}
+        edges.attributes_index = {
+            tuple(sorted(attributes.items())): index for index, attributes in enumerate(edges.attributes)
+        }
+
+        return edges
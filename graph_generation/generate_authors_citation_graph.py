@@ -4,11 +4,15 @@ from generate_graph import GenerateGraph
 # Core imports
 import json
 import os
+from typing import Hashable, List, Tuple
 
 # Library imports
 import networkx as nx
+import scipy.sparse as sp
 import fire
 
+from sparse_projections import citation_projection
+
 # Constants
 CONFERENCE_IDS = ["1184914352", "1127325140", "1203999783"]
 CONFERENCE_NAME = "AAAI-NIPS-IJCAI"
@@ -16,127 +20,74 @@ GRAPH_TYPE = "authors_citation"
 
 
 class AuthorsCitationGraph(GenerateGraph):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, aggregated: bool = False, **kwargs):
+        """
+        With `aggregated`, the graph is a DiGraph with a single edge per pair of
+        authors, weighted by how many times the first cited the second, instead
+        of a MultiDiGraph with an edge per citation
+        """
         # Configure to current directory
         os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
         super().__init__(*args, **kwargs)
 
-    def generate(
-        self,
-        save_gpickle: bool = True,
-        save_yearly_gpickle: bool = False,
-        save_non_cummulated_yearly_gpickle: bool = False,
-        read_from_dblp: bool = True,
-        save_from_dblp: bool = False,
-        read_saved_from_dblp: bool = False,
-        generate_graph: bool = True,
-        compute_degree: bool = True,
-        compute_closeness: bool = True,
-        compute_betweenness: bool = True,
-        compute_pagerank: bool = True,
-    ) -> None:
-        """Function to generate the recommender systems graph
-
-        Arguments:
-
-            save_gpickle (bool): Save the final graph generated to a GML
-                file, named by `self.graph_file`
-
-            save_yearly_gpickle (bool): Save the graph generated in each
-                year timestep to a GML file
-
-            read_from_dblp (bool): Read the graph from the dblp json
-                file. If false, reads from the `self.conference_name` json
-
-            save_from_dblp (bool): Saves the parsed papers to a json
-                file.
-
-            generate_graph (bool): Generates the authors_and_papers
-                graph from the  articles read
+        self.aggregated = aggregated
+        self.WEIGHTED_EDGES = aggregated
+
+    def create_graph(self) -> nx.Graph:
+        return nx.DiGraph() if self.aggregated else nx.MultiDiGraph()
+
+    def add_papers(self, year: int, papers: List[dict]) -> None:
+        if self.aggregated:
+            self.add_aggregated_papers(year, papers)
+            return
+
+        src, dst = [], []
+        for paper in papers:
+            # Adiciona/atualiza nodos dos autores
+            authors = [self.edges.add_node(author["id"], name=author.get("name", "")) for author in paper["authors"]]
+
+            # Adiciona arestas, from each of this paper authors to each of the cited paper authors
+            for citation_id in paper["references"]:
+                if citation_id in self.registry:
+                    for other_author in self.registry.authors_of(citation_id):
+                        src.extend(authors)
+                        dst.extend([self.edges.local(other_author["id"])] * len(authors))
+
+        # Every citation of the year at once
+        self.edges.add_edges(src, dst, year)
+
+    def add_aggregated_papers(self, year: int, papers: List[dict]) -> None:
+        """Add the year citations between authors at once, as AᵀCA"""
+        # Adiciona/atualiza nodos dos autores
+        paper_authors = [
+            [self.edges.add_node(author["id"], name=author.get("name", "")) for author in paper["authors"]]
+            for paper in papers
+        ]
+
+        # Papers cited this year, and the (citing, cited) pairs
+        cited_index = {}
+        citations = [
+            (row, cited_index.setdefault(citation_id, len(cited_index)))
+            for row, paper in enumerate(papers)
+            for citation_id in paper["references"]
+            if citation_id in self.registry
+        ]
+        cited_authors = [
+            [self.edges.local(author["id"]) for author in self.registry.authors_of(citation_id)]
+            for citation_id in cited_index
+        ]
+
+        W = citation_projection(paper_authors, cited_authors, citations, len(self.edges.nodes))
+        self.edges.add_edges(W.row, W.col, year, weights=W.data)
+
+    def citation_matrix(self, year: int, cumulative: bool = True) -> Tuple[sp.csr_matrix, List[Hashable]]:
         """
-
-        self.G = nx.MultiDiGraph()
-        self.yearly_G = nx.MultiDiGraph()
-
-        # Read file adding to array
-        if read_from_dblp:
-            conference_papers = self.read_from_dblp(read_saved_from_dblp, save_from_dblp)
-        else:
-            conference_papers = self.read_from_json()
-
-        # Store older_papers in an arrray
-        older_papers = {}
-
-        # Iterate through all the dataset years
-        for year in range(self.min_year, self.max_year):
-
-            # Reset yearly graph
-            if save_non_cummulated_yearly_gpickle:
-                self.yearly_G = nx.DiGraph()
-
-            if generate_graph and read_from_dblp:
-                print(f"Parsing year {str(year)}")
-
-                # Add papers and authors to be referenced later
-                for paper in conference_papers.get(year, []):
-                    older_papers[paper["id"]] = [author for author in paper["authors"]]
-
-                for paper in conference_papers.get(year, []):
-                    # Adiciona/atualiza nodos dos autores
-                    for author in paper["authors"]:
-                        self.G.add_node(author["id"], name=author.get("name", ""))
-
-                        if save_non_cummulated_yearly_gpickle:
-                            self.yearly_G.add_node(author["id"], name=author.get("name", ""))
-
-                    # Adiciona arestas
-                    for citation_id in paper["references"]:
-                        # Other paper authors
-                        if citation_id in older_papers:
-                            for other_author in older_papers[citation_id]:
-                                for author in paper["authors"]:
-                                    # This paper authors
-                                    self.G.add_edge(author["id"], other_author["id"])
-
-                                    if save_non_cummulated_yearly_gpickle:
-                                        self.yearly_G.add_edge(author["id"], other_author["id"])
-
-                self.print_graph_info()
-            else:
-                self.G = self.read_from_gpickle(year)
-
-            # Saving graph to .gpickle file
-            if save_yearly_gpickle and self.G.number_of_nodes() > 0:
-                # Compute centralities for each year
-                self.compute_centralities(
-                    degree=compute_degree,
-                    betweenness=compute_betweenness,
-                    closeness=compute_closeness,
-                    pagerank=compute_pagerank,
-                )
-
-                super().save_yearly_gpickle(year)
-
-                if save_non_cummulated_yearly_gpickle:
-                    # Compute centralities for each year
-                    self.compute_centralities(
-                        degree=compute_degree,
-                        betweenness=compute_betweenness,
-                        closeness=compute_closeness,
-                        pagerank=compute_pagerank,
-                        G=self.yearly_G,
-                    )
-
-                    super().save_yearly_gpickle(year, G=self.yearly_G, graph_name="yearly_" + self.graph_name)
-
-        if generate_graph and read_from_dblp:
-            print("Finished creating the graph")
-            self.print_graph_info()
-
-        # Save graph to .gpickle
-        if generate_graph and save_gpickle:
-            super().save_gpickle()
+        Author x author matrix with the amount of citations up to `year`
+        (or only in `year`, if not `cumulative`), and the author of each row
+        """
+        W = self.edges.to_csr(max_year=year, min_year=None if cumulative else year)
+        return W, self.edges.nodes
 
 
 if __name__ == "__main__":
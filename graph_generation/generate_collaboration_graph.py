@@ -4,11 +4,15 @@ from generate_graph import GenerateGraph
 # Core imports
 import json
 import os
+from typing import Hashable, List, Tuple
 
 # Library imports
 import networkx as nx
+import scipy.sparse as sp
 import fire
 
+from sparse_projections import co_membership, incidence_matrix
+
 # Constants
 CONFERENCE_IDS = ["1184914352", "1127325140", "1203999783"]
 CONFERENCE_NAME = "AAAI-NIPS-IJCAI"
@@ -16,121 +20,36 @@ GRAPH_TYPE = "collaboration"
 
 
 class CollaborationGraph(GenerateGraph):
+    # Edges are weighted by the amount of papers both authors wrote together
+    WEIGHTED_EDGES = True
+
     def __init__(self, *args, **kwargs):
         # Configure to current directory
         os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
         super().__init__(*args, **kwargs)
 
-    def generate(
-        self,
-        save_gpickle: bool = True,
-        save_yearly_gpickle: bool = False,
-        save_non_cummulated_yearly_gpickle: bool = False,
-        read_from_dblp: bool = True,
-        save_from_dblp: bool = False,
-        read_saved_from_dblp: bool = False,
-        generate_graph: bool = True,
-        compute_degree: bool = True,
-        compute_closeness: bool = True,
-        compute_betweenness: bool = True,
-        compute_pagerank: bool = True,
-    ) -> None:
-        """Function to generate the recommender systems graph
-
-        Arguments:
+    def create_graph(self) -> nx.Graph:
+        return nx.DiGraph()
 
-            save_gpickle (bool): Save the final graph generated to a GML
-                file, named by `self.graph_file`
+    def add_papers(self, year: int, papers: List[dict]) -> None:
+        # First create the nodes, keeping each paper authors local indexes
+        paper_authors = [
+            [self.edges.add_node(author["id"], name=author.get("name", "")) for author in paper["authors"]]
+            for paper in papers
+        ]
 
-            save_yearly_gpickle (bool): Save the graph generated in each
-                year timestep to a GML file
+        # Then every pair of co-authors at once, from the paper x author incidence matrix
+        W = co_membership(incidence_matrix(paper_authors, len(self.edges.nodes)))
+        self.edges.add_edges(W.row, W.col, year, weights=W.data)
 
-            read_from_dblp (bool): Read the graph from the dblp json
-                file. If false, reads from the `self.conference_name` json
-
-            save_from_dblp (bool): Saves the parsed papers to a json
-                file.
-
-            generate_graph (bool): Generates the authors_and_papers
-                graph from the  articles read
+    def collaboration_matrix(self, year: int, cumulative: bool = True) -> Tuple[sp.csr_matrix, List[Hashable]]:
         """
-
-        self.G = nx.DiGraph()
-        self.yearly_G = nx.DiGraph()
-
-        # Read file adding to array
-        if read_from_dblp:
-            conference_papers = self.read_from_dblp(read_saved_from_dblp, save_from_dblp)
-        else:
-            conference_papers = self.read_from_json()
-
-        # Iterate through all the dataset years
-        for year in range(self.min_year, self.max_year):
-
-            # Reset yearly graph
-            if save_non_cummulated_yearly_gpickle:
-                self.yearly_G = nx.DiGraph()
-
-            if generate_graph and read_from_dblp:
-                print(f"Parsing year {str(year)}")
-
-                for paper in conference_papers.get(year, []):
-                    # First create the nodes
-                    for author in paper["authors"]:
-                        self.G.add_node(author["id"], name=author.get("name", ""))
-
-                        if save_non_cummulated_yearly_gpickle:
-                            self.yearly_G.add_node(author["id"], name=author.get("name", ""))
-
-                    # Add the edges
-                    for author_main in paper["authors"]:
-                        for author_collaborator in paper["authors"]:
-                            if author_main != author_collaborator:
-                                self.G.add_edge(
-                                    author_main["id"], author_collaborator["id"], name=paper.get("title", "")
-                                )
-
-                                if save_non_cummulated_yearly_gpickle:
-                                    self.yearly_G.add_edge(
-                                        author_main["id"], author_collaborator["id"], name=paper.get("title", "")
-                                    )
-
-                self.print_graph_info()
-            else:
-                self.G = self.read_from_gpickle(year)
-
-            # Saving graph to .gpickle file
-            if save_yearly_gpickle and self.G.number_of_nodes() > 0:
-                # Compute centralities for each year
-                self.compute_centralities(
-                    degree=compute_degree,
-                    betweenness=compute_betweenness,
-                    closeness=compute_closeness,
-                    pagerank=compute_pagerank,
-                )
-
-                super().save_yearly_gpickle(year)
-
-                if save_non_cummulated_yearly_gpickle:
-                    # Compute centralities for each year
-                    self.compute_centralities(
-                        degree=compute_degree,
-                        betweenness=compute_betweenness,
-                        closeness=compute_closeness,
-                        pagerank=compute_pagerank,
-                        G=self.yearly_G,
-                    )
-
-                    super().save_yearly_gpickle(year, G=self.yearly_G, graph_name="yearly_" + self.graph_name)
-
-        if generate_graph and read_from_dblp:
-            print("Finished creating the graph")
-            self.print_graph_info()
-
-        # Save final graph to .gpickle
-        if generate_graph and save_gpickle:
-            super().save_gpickle()
+        Author x author matrix with the amount of joint papers up to `year`
+        (or only in `year`, if not `cumulative`), and the author of each row
+        """
+        W = self.edges.to_csr(max_year=year, min_year=None if cumulative else year)
+        return W, self.edges.nodes
 
 
 if __name__ == "__main__":
@@ -6,49 +6,58 @@ from generate_graph import GenerateGraph
 # Core imports
 import json
 import os
+from functools import lru_cache
+from typing import List, Tuple
 from pprint import pprint as pp
 from tqdm import tqdm
 
 # Library imports
 import networkx as nx
+import numpy as np
 import fire
 
+from country_matcher import CountryMatcher
+from sparse_projections import citation_projection
+
 # Constants
 CONFERENCE_IDS = ["1184914352", "1127325140", "1203999783"]
 CONFERENCE_NAME = "AAAI-NIPS-IJCAI"
 GRAPH_TYPE = "countries_citation"
 
-COUNTRY_REPLACEMENT = {}
-
+COUNTRY_MATCHER = CountryMatcher({})
 
-def infer_country_from(organization: str):
-    # Parse last name
-    country = organization.split(",")[-1].replace(".", "").lower().strip()
 
-    # Make country replacement
-    if country in COUNTRY_REPLACEMENT.keys() and COUNTRY_REPLACEMENT[country] is not None:
-        return (True, COUNTRY_REPLACEMENT[country])
-
-    return (False, country)
+@lru_cache(maxsize=None)
+def infer_country_from(organization: str) -> Tuple[bool, str]:
+    """Country of an org (and whether it was found), resolved once per distinct org"""
+    return COUNTRY_MATCHER(organization)
 
 
 class CountryCitationGraph(GenerateGraph):
-    def __init__(self, *args, **kwargs):
-        global COUNTRY_REPLACEMENT
+    def __init__(self, *args, aggregated: bool = False, **kwargs):
+        """
+        With `aggregated`, the graph is a DiGraph with a single edge per pair of
+        countries, weighted by the amount of author citations between them
+        """
+        global COUNTRY_MATCHER
 
         # Configure to current directory
         os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
-        with open("./country_replacement.json", "r") as f:
-            COUNTRY_REPLACEMENT = json.load(f)
+        COUNTRY_MATCHER = CountryMatcher.load("./country_replacement.json")
+        infer_country_from.cache_clear()
 
         super().__init__(*args, **kwargs)
 
+        self.aggregated = aggregated
+        self.WEIGHTED_EDGES = aggregated
+
     def generate(
         self,
         save_gpickle: bool = False,
         save_yearly_gpickle: bool = False,
         save_non_cummulated_yearly_gpickle: bool = False,
+        save_temporal_store: bool = False,
         read_from_dblp: bool = False,
         save_from_dblp: bool = False,
         read_saved_from_dblp: bool = False,
@@ -57,6 +66,12 @@ class CountryCitationGraph(GenerateGraph):
         compute_closeness: bool = False,
         compute_betweenness: bool = False,
         compute_pagerank: bool = False,
+        betweenness_k: int = None,
+        betweenness_epsilon: float = None,
+        resume_centralities: bool = False,
+        centrality_address: str = None,
+        centrality_shared_dir: str = None,
+        centrality_workers: int = None,
         generate_missing_countries: bool = False,
     ) -> None:
         """Function to generate the recommender systems graph
@@ -69,6 +84,9 @@ class CountryCitationGraph(GenerateGraph):
             save_yearly_gpickle (bool): Save the graph generated in each
                 year timestep to a GML file
 
+            save_temporal_store (bool): Save the year-stamped log of the
+                graph, from which the graph of any year can be rebuilt
+
             read_from_dblp (bool): Read the graph from the dblp json
                 file. If false, reads from the `self.conference_name` json
 
@@ -80,126 +98,106 @@ class CountryCitationGraph(GenerateGraph):
 
             generate_graph (bool): Generates the authors_and_papers
                 graph from the  articles read
+
+            generate_missing_countries (bool): Instead of generating the
+                graph, save the organizations we couldn't infer a country from
         """
+        options = {key: value for key, value in locals().items() if key != "self"}
+        self.run_generation(**options)
 
-        self.G = nx.MultiDiGraph()
-        self.yearly_G = nx.MultiDiGraph()
+    def create_graph(self) -> nx.Graph:
+        return nx.DiGraph() if self.aggregated else nx.MultiDiGraph()
 
-        # Read file adding to array
-        if read_from_dblp:
-            conference_papers = self.read_from_dblp(read_saved_from_dblp, save_from_dblp)
-        else:
-            conference_papers = self.read_from_json()
+    def start_generation(self, **kwargs) -> None:
+        super().start_generation(**kwargs)
 
-        # Store older_papers in an arrray
-        older_papers = {}
+        # Local index of the country of each author of each paper added, resolved once
+        self.paper_countries = {}
 
-        # Store missing countries
-        missing_set = set()
+        # Store missing countries, and how many authorships have each org
+        self.missing_set = set()
+        self.org_counts = defaultdict(lambda: 0)
 
         # Store papers count per conference
-        papers_count = defaultdict(lambda: 0)
+        self.papers_count = defaultdict(lambda: 0)
 
         # Store papers count per year
-        papers_year_count = defaultdict(lambda: 0)
-
-        # Iterate through all the dataset years
-        for year in tqdm(range(self.min_year, self.max_year)):
-
-            # Reset yearly graph
-            if save_non_cummulated_yearly_gpickle:
-                self.yearly_G = nx.DiGraph()
-
-            if generate_missing_countries:
-                print(f"Generating missing countries for year {str(year)}")
-
-                for paper in conference_papers.get(str(year), []):
-                    for author in paper["authors"]:
-                        for org in [author.get("org", ""), *author.get("orgs", [])]:
-                            found, country = infer_country_from(org)
-                            if not found and country not in missing_set:
-                                missing_set.add(country)
-
-                    papers_count[paper["venue"]["raw"]] += 1
-                    papers_year_count[year] += 1
-
-            elif generate_graph and read_from_dblp:
-                print(f"Parsing year {str(year)}")
-
-                # Add papers and authors to be referenced later
-                for paper in conference_papers.get(year, []):
-                    older_papers[paper["id"]] = [author for author in paper["authors"]]
-
-                for paper in conference_papers.get(year, []):
-                    # Adiciona/atualiza nodos dos países
-                    for author in paper["authors"]:
-                        country = infer_country_from(author.get("org", ""))
-                        if country is not None:
-                            self.G.add_node(country)
-
-                            if save_non_cummulated_yearly_gpickle:
-                                self.yearly_G.add_node(country)
-
-                    # Adiciona arestas
-                    for citation_id in paper["references"]:
-                        # Other paper authors
-                        if citation_id in older_papers:
-                            for other_author in older_papers[citation_id]:
-                                for author in paper["authors"]:
-                                    # Fetch countries
-                                    country = infer_country_from(author.get("org", ""))
-                                    other_country = infer_country_from(other_author.get("org", ""))
-
-                                    # Add edge
-                                    if country is not None and other_country is not None:
-                                        self.G.add_edge(country, other_country)
-
-                                        if save_non_cummulated_yearly_gpickle:
-                                            self.yearly_G.add_edge(country, other_country)
-
-                self.print_graph_info()
-            else:
-                self.G = self.read_from_gpickle(year)
-
-            # Saving graph to .gpickle file
-            if save_yearly_gpickle and self.G.number_of_nodes() > 0:
-                # Compute centralities for each year
-                self.compute_centralities(
-                    degree=compute_degree,
-                    betweenness=compute_betweenness,
-                    closeness=compute_closeness,
-                    pagerank=compute_pagerank,
-                )
-
-                super().save_yearly_gpickle(year)
-
-                if save_non_cummulated_yearly_gpickle:
-                    # Compute centralities for each year
-                    self.compute_centralities(
-                        degree=compute_degree,
-                        betweenness=compute_betweenness,
-                        closeness=compute_closeness,
-                        pagerank=compute_pagerank,
-                        G=self.yearly_G,
-                    )
-
-                    super().save_yearly_gpickle(year, G=self.yearly_G, graph_name="yearly_" + self.graph_name)
+        self.papers_year_count = defaultdict(lambda: 0)
+
+    def build_year(
+        self, year: int, conference_papers: dict, generate_missing_countries: bool = False, **kwargs
+    ) -> None:
+        if not generate_missing_countries:
+            super().build_year(year, conference_papers, **kwargs)
+            return
+
+        print(f"Generating missing countries for year {str(year)}")
+
+        # Orgs are only counted here, and resolved at once when finishing
+        for paper in conference_papers.get(year, conference_papers.get(str(year), [])):
+            for author in paper["authors"]:
+                for org in [author.get("org", ""), *author.get("orgs", [])]:
+                    self.org_counts[org] += 1
+
+            self.papers_count[paper["venue"]["raw"]] += 1
+            self.papers_year_count[year] += 1
+
+    def add_papers(self, year: int, papers: List[dict]) -> None:
+        # Adiciona/atualiza nodos dos países
+        for paper in papers:
+            self.paper_countries[paper["id"]] = [self.add_country(author) for author in paper["authors"]]
+
+        # Author citations between countries, counted at once as AᵀCA over papers x countries
+        cited_index = {}
+        citations = [
+            (row, cited_index.setdefault(citation_id, len(cited_index)))
+            for row, paper in enumerate(papers)
+            for citation_id in paper["references"]
+            if citation_id in self.registry
+        ]
+        W = citation_projection(
+            [self.paper_countries[paper["id"]] for paper in papers],
+            [self.countries_of(citation_id) for citation_id in cited_index],
+            citations,
+            len(self.edges.nodes),
+        )
+
+        # Adiciona arestas, a single weighted one per pair or as many as the citations
+        if self.aggregated:
+            self.edges.add_edges(W.row, W.col, year, weights=W.data)
+        else:
+            self.edges.add_edges(np.repeat(W.row, W.data), np.repeat(W.col, W.data), year)
+
+    def countries_of(self, paper_id) -> List[int]:
+        """Countries of a registered paper, also when it was registered by another generator"""
+        countries = self.paper_countries.get(paper_id)
+        if countries is None:
+            countries = self.paper_countries[paper_id] = [
+                self.add_country(author) for author in self.registry.authors_of(paper_id)
+            ]
+        return countries
+
+    def add_country(self, author: dict) -> int:
+        """Local index of the country node of an author"""
+        found, country = infer_country_from(author.get("org", ""))
+        return self.edges.add_node(country, found=found)
+
+    def finish_generation(self, conference_papers: dict, **kwargs) -> None:
+        if self.org_counts:
+            COUNTRY_MATCHER.reset_stats()
+            resolved = COUNTRY_MATCHER.resolve_all(self.org_counts)
+            self.missing_set.update(country for found, country in resolved.values() if not found)
+            COUNTRY_MATCHER.report()
 
         with open("../data/missing_countries.json", "w") as f:
-            json.dump({country: "" for country in missing_set}, f)
+            json.dump({country: "" for country in self.missing_set}, f)
 
         count = sum(len(value) for value in conference_papers.values())
-        print("Papers count per conference", papers_count)
-        print("Papers count per year", papers_year_count)
+        print("Papers count per conference", self.papers_count)
+        print("Papers count per year", self.papers_year_count)
         print("Total papers count: ", count)
 
-        if generate_graph and read_from_dblp:
-            print("Finished creating the graph")
-            self.print_graph_info()
-
-        # Save graph to .gpickle
-        if generate_graph and save_gpickle:
-            super().save_gpickle()
+        super().finish_generation(conference_papers, **kwargs)
 
 
 if __name__ == "__main__":
@@ -1,5 +1,10 @@
 # Imports
+import hashlib
+import inspect
 import json
+import os
+import pickle
+import shutil
 from typing import TypeVar, List
 
 import fire
@@ -8,8 +13,20 @@ import json_stream
 from json_stream.dump import JSONStreamEncoder
 from tqdm import tqdm, trange
 
+from dblp_shards import read_dblp_parallel
+from edge_buffer import EdgeBuffer
+from temporal_store import TemporalGraphStore
+from id_dictionary import IdDictionary
+from paper_registry import PaperRegistry
+from paper_store import PaperStore, _materialize
+from venue_index import VenueIndex
+from venue_classifier import VenueFilter, csrankings_areas
 from parallel_betweenness import betweenness_centrality_parallel
 from parallel_closeness import closeness_centrality_parallel
+from pagerank import IncrementalPageRank, pagerank
+from centrality_engine import fused_centralities
+from centrality_store import CENTRALITY_METRICS, CentralityStore
+from csr_graph import CSRGraph
 
 # Helper function
 T = TypeVar("T")
@@ -56,6 +73,11 @@ CONFERENCE_IDS = {
         "SIGIR",
         "WWW",
     ),
+    # Every venue CSRankings lists in conferences.md, by area (see `venue_classifier.py`)
+    "CsRankings-all": csrankings_areas(),
+    "CsRankings-Systems": ["csrankings:systems"],
+    "CsRankings-Theory": ["csrankings:theory"],
+    "CsRankings-Interdisciplinary": ["csrankings:interdisciplinary areas"],
 }
 
 VERSION = "v13"
@@ -64,7 +86,31 @@ VERSION = "v13"
 class GenerateGraph:
     DATASET_SIZE = 5_354_309
     GML_BASE_PATH = "../GML/"
+    TEMPORAL_BASE_PATH = "../GML/temporal/"
+    CHECKPOINT_BASE_PATH = "../GML/checkpoints/"
+    CENTRALITY_BASE_PATH = "../GML/centralities/"
     DBLP_FILENAME = f"../dblp_arnet.{VERSION}.json"
+    PAPER_STORE_PATH = f"../data/paper_store_{VERSION}"
+    VENUE_INDEX_PATH = f"../data/venue_index_{VERSION}"
+    CACHE_PATH = "../data/cache/"
+    ID_DICTIONARY_PATH = f"../data/id_dictionary_{VERSION}"
+
+    # Whether edges carry a `weight` (e.g. the amount of joint papers), summed over the years
+    WEIGHTED_EDGES = False
+
+    # Node attributes set by `compute_centralities`
+    CENTRALITY_ATTRIBUTES = CENTRALITY_METRICS
+
+    # Fields kept for each paper by `get_data`, part of the cache key
+    PAPER_FIELDS = ("id", "title", "venue", "year", "authors", "references")
+
+    # Last filtered paper set read in this process, shared by every generator
+    _cached_conference_papers = (None, None)
+
+    # Dense ids dictionary, loaded once and shared by every generator,
+    # and the last papers encoded with it (keyed by the papers object)
+    _id_dictionary = None
+    _encoded_conference_papers = (None, None)
 
     def __init__(
         self,
@@ -73,6 +119,10 @@ class GenerateGraph:
         conference_ids: List[int] = None,
         min_year: int = 1890,
         max_year: int = 2021,
+        parallel_ingest: bool = False,
+        ingest_processes: int = None,
+        use_cache: bool = True,
+        dense_ids: bool = True,
     ):
 
         self.graph_name = graph_name
@@ -80,13 +130,315 @@ class GenerateGraph:
         self.conference_ids = conference_ids
         self.min_year = min_year
         self.max_year = max_year
+        self.parallel_ingest = parallel_ingest
+        self.ingest_processes = ingest_processes
+        self.use_cache = use_cache
+        self.dense_ids = dense_ids
 
         self.G = nx.Graph()  # placeholder
         self.yearly_G = nx.Graph()  # placeholder
+        self.temporal_store = None  # loaded by `read_from_gpickle`, if saved
+
+        # PageRank of G, warm-started from its value in the previous year
+        self.incremental_pagerank = IncrementalPageRank()
+
+    def generate(
+        self,
+        save_gpickle: bool = True,
+        save_yearly_gpickle: bool = False,
+        save_non_cummulated_yearly_gpickle: bool = False,
+        save_temporal_store: bool = False,
+        read_from_dblp: bool = True,
+        save_from_dblp: bool = False,
+        read_saved_from_dblp: bool = False,
+        generate_graph: bool = True,
+        compute_degree: bool = True,
+        compute_closeness: bool = True,
+        compute_betweenness: bool = True,
+        compute_pagerank: bool = True,
+        betweenness_k: int = None,
+        betweenness_epsilon: float = None,
+        resume_centralities: bool = False,
+        centrality_address: str = None,
+        centrality_shared_dir: str = None,
+        centrality_workers: int = None,
+    ) -> None:
+        """Function to generate the graph, year by year
+
+        Arguments:
+
+            save_gpickle (bool): Save the final graph generated to a GML
+                file, named by `self.graph_file`
+
+            save_yearly_gpickle (bool): Save the graph generated in each
+                year timestep to a GML file
+
+            save_non_cummulated_yearly_gpickle (bool): Also save a graph
+                with only what was added in each year timestep
+
+            save_temporal_store (bool): Save the year-stamped log of the
+                graph, from which the graph of any year can be rebuilt
+                (see `temporal_store.py`), and which `read_from_gpickle` reads
+
+            read_from_dblp (bool): Read the graph from the dblp json
+                file. If false, reads from the `self.conference_name` json
+
+            save_from_dblp (bool): Saves the parsed papers to a json
+                file.
+
+            read_saved_from_dblp (bool): Read the conference_papers dict
+                from a json file, saved previously with `save_from_dblp`.
+
+            generate_graph (bool): Generates the graph from the articles read
+
+            betweenness_k (int): Approximate betweenness from this many
+                random pivot sources, instead of from every node
+
+            betweenness_epsilon (float): Approximate betweenness from as
+                many pivots as needed for this error (with 90% probability)
+
+            resume_centralities (bool): Resume the betweenness and closeness
+                of each year from the source ranges checkpointed by an
+                interrupted run, instead of computing them from zero, and
+                read back those it finished (or saved with the year) instead
+
+            centrality_address (str): "host:port" to serve the betweenness
+                and closeness source ranges from, to the workers started in
+                other hosts with `distributed_centrality.py`, with the key in
+                the CENTRALITY_AUTHKEY environment variable. Just a port
+                only serves them to this host
+
+            centrality_shared_dir (str): Directory, readable by every worker,
+                where graphs are saved for them
+
+            centrality_workers (int): Worker processes the betweenness and
+                closeness source ranges are split for: those in every host,
+                with a `centrality_address` (required then), otherwise the
+                cores of this host, by default
+        """
+        options = {key: value for key, value in locals().items() if key != "self"}
+        self.run_generation(**options)
+
+    def generation_options(self, **kwargs) -> dict:
+        """Every `generate` argument, with its default unless given in `kwargs`"""
+        bound_arguments = inspect.signature(self.generate).bind(**kwargs)
+        bound_arguments.apply_defaults()
+
+        return dict(bound_arguments.arguments)
+
+    def read_papers(
+        self, read_from_dblp: bool = True, read_saved_from_dblp: bool = False, save_from_dblp: bool = False, **kwargs
+    ) -> dict:
+        """
+        Read the year-keyed conference papers, as configured by the `generate` arguments.
+        With `self.dense_ids`, paper and author ids are replaced by their dense int ids
+        """
+        if read_from_dblp:
+            conference_papers = self.read_from_dblp(read_saved_from_dblp, save_from_dblp)
+        else:
+            conference_papers = self.read_from_json()
+
+        if self.dense_ids:
+            conference_papers = self.encode_ids(conference_papers)
+
+        return conference_papers
+
+    @classmethod
+    def id_dictionary(cls) -> IdDictionary:
+        """The dense ids dictionary shared by every generator, use `to_original` for reverse lookups"""
+        if GenerateGraph._id_dictionary is None:
+            GenerateGraph._id_dictionary = IdDictionary.load(cls.ID_DICTIONARY_PATH)
+
+        return GenerateGraph._id_dictionary
+
+    def encode_ids(self, conference_papers: dict) -> dict:
+        """Encode the papers ids with the dense ids dictionary, persisting any new ids"""
+        encoded_from, encoded_conference_papers = GenerateGraph._encoded_conference_papers
+        if encoded_from is conference_papers:
+            return encoded_conference_papers
+
+        id_dictionary = self.id_dictionary()
+        encoded_conference_papers = id_dictionary.encode_papers(conference_papers)
+        id_dictionary.save(self.ID_DICTIONARY_PATH)
+
+        GenerateGraph._encoded_conference_papers = (conference_papers, encoded_conference_papers)
+        return encoded_conference_papers
+
+    def run_generation(self, conference_papers: dict = None, **options) -> None:
+        """Generate the graph with the `generate` arguments in `options`"""
 
-    def generate(self, **kwargs):
+        # Read file adding to array
+        if conference_papers is None:
+            conference_papers = self.read_papers(**options)
+
+        self.start_generation()
+
+        # Iterate through all the dataset years
+        for year in range(self.min_year, self.max_year):
+            self.generate_year(year, conference_papers, **options)
+
+        self.finish_generation(conference_papers, **options)
+
+    def create_graph(self) -> nx.Graph:
+        """Empty graph of the type this generator builds"""
+        raise NotImplementedError("You must implement this method")
+
+    def start_generation(self, registry: PaperRegistry = None) -> None:
+        """
+        Reset the graphs, and whatever is kept between years, before generating them.
+        A `registry` can be shared by generators fed with the same papers
+        """
+        self.G = self.create_graph()
+        self.incremental_pagerank = IncrementalPageRank()
+
+        # Papers added so far, to be referenced by the later ones
+        self.registry = registry if registry is not None else PaperRegistry()
+
+        # Nodes and edges are logged here by `add_papers`, and materialized in bulk
+        self.edges = EdgeBuffer(weighted=self.WEIGHTED_EDGES)
+        self.materialized = self.edges.mark()
+
+    def add_papers(self, year: int, papers: List[dict]) -> None:
+        """Log the nodes and edges of the `papers` published in `year` to `self.edges`"""
         raise NotImplementedError("You must implement this method")
 
+    def build_year(
+        self,
+        year: int,
+        conference_papers: dict,
+        read_from_dblp: bool = True,
+        generate_graph: bool = True,
+        **kwargs,
+    ) -> None:
+        """Add the papers of `year` to the graph, or read it from the saved gpickle"""
+        if generate_graph and read_from_dblp:
+            print(f"Parsing year {str(year)}")
+
+            # Papers are registered before being added, so they can already be cited
+            papers = conference_papers.get(year, [])
+            self.registry.add_papers(papers)
+            self.add_papers(year, papers)
+            self.edges.end_year(year)
+
+            # Add everything logged this year to the graph at once
+            self.edges.materialize(self.G, since=self.materialized)
+            self.materialized = self.edges.mark()
+
+            self.print_graph_info()
+        else:
+            self.read_from_gpickle(year)
+
+    def generate_year(
+        self,
+        year: int,
+        conference_papers: dict,
+        save_yearly_gpickle: bool = False,
+        save_non_cummulated_yearly_gpickle: bool = False,
+        compute_degree: bool = True,
+        compute_closeness: bool = True,
+        compute_betweenness: bool = True,
+        compute_pagerank: bool = True,
+        betweenness_k: int = None,
+        betweenness_epsilon: float = None,
+        resume_centralities: bool = False,
+        centrality_address: str = None,
+        centrality_shared_dir: str = None,
+        centrality_workers: int = None,
+        **kwargs,
+    ) -> None:
+        """Build the graph for `year`, then compute its centralities and save it, if asked to"""
+        self.build_year(year, conference_papers, **kwargs)
+
+        # Saving graph to .gpickle file
+        if save_yearly_gpickle and self.G.number_of_nodes() > 0:
+            # Only what was added this year, without the centralities G had last year
+            if save_non_cummulated_yearly_gpickle:
+                self.yearly_G = self.year_graph(year)
+
+                # A view shares the node attributes of G, so it is copied before its centralities are set
+                if nx.is_frozen(self.yearly_G):
+                    self.yearly_G = self.yearly_G.copy()
+                    for _, attributes in self.yearly_G.nodes(data=True):
+                        for centrality in self.CENTRALITY_ATTRIBUTES:
+                            attributes.pop(centrality, None)
+
+            # Compute centralities for each year
+            self.compute_centralities(
+                degree=compute_degree,
+                betweenness=compute_betweenness,
+                closeness=compute_closeness,
+                pagerank=compute_pagerank,
+                betweenness_k=betweenness_k,
+                betweenness_epsilon=betweenness_epsilon,
+                snapshot_name=self.snapshot_name(year),
+                resume=resume_centralities,
+                address=centrality_address,
+                shared_dir=centrality_shared_dir,
+                workers=centrality_workers,
+            )
+
+            self.save_yearly_gpickle(year)
+
+            if save_non_cummulated_yearly_gpickle:
+                # Compute centralities for each year
+                self.compute_centralities(
+                    degree=compute_degree,
+                    betweenness=compute_betweenness,
+                    closeness=compute_closeness,
+                    pagerank=compute_pagerank,
+                    G=self.yearly_G,
+                    betweenness_k=betweenness_k,
+                    betweenness_epsilon=betweenness_epsilon,
+                    snapshot_name=self.snapshot_name(year, graph_name="yearly_" + self.graph_name),
+                    resume=resume_centralities,
+                    address=centrality_address,
+                    shared_dir=centrality_shared_dir,
+                    workers=centrality_workers,
+                )
+
+                self.save_yearly_gpickle(year, G=self.yearly_G, graph_name="yearly_" + self.graph_name)
+
+    def snapshot_name(self, year: int, graph_name: str = None) -> str:
+        """Name of the graph of `year`, for its centrality checkpoints and store"""
+        graph_name = graph_name or self.graph_name
+        return "{}_{}_{}".format(graph_name, self.conference_name, year)
+
+    def year_graph(self, year: int) -> nx.Graph:
+        """
+        Graph with only the nodes and edges added in `year`. Weighted edges are replayed
+        from its part of the log, so they only count that year. Otherwise it is a read-only
+        view of G, with the edges (last) logged that year, sharing its node attributes
+        """
+        since, until = self.edges.mark_at(year - 1), self.edges.mark_at(year)
+        if self.edges.weighted:
+            return self.edges.materialize(self.create_graph(), since=since, until=until)
+
+        G = self.G
+        nodes = self.edges.nodes_between(since, until)
+        return nx.subgraph_view(
+            G, filter_node=nodes.__contains__, filter_edge=lambda *edge: G.edges[edge]["year"] == year
+        )
+
+    def finish_generation(
+        self,
+        conference_papers: dict,
+        save_gpickle: bool = True,
+        save_temporal_store: bool = False,
+        read_from_dblp: bool = True,
+        generate_graph: bool = True,
+        **kwargs,
+    ) -> None:
+        if generate_graph and read_from_dblp:
+            print("Finished creating the graph")
+            self.print_graph_info()
+
+            if save_temporal_store:
+                TemporalGraphStore.save(self.temporal_store_path(), self.edges, self.G)
+
+        # Save graph to .gpickle
+        if generate_graph and save_gpickle:
+            self.save_gpickle()
+
     @staticmethod
     def get_data(dictionary: dict = {}) -> dict:
         """Given a dictionary, parse the necessary data contained in it"""
@@ -96,7 +448,8 @@ class GenerateGraph:
         return {
             "id": dictified_dict.get("_id", dictified_dict.get("id", 0)),
             "title": dictified_dict.get("title", ""),
-            "venue": dictified_dict.get("venue", None),
+            # Plain dict, as a streamed one can't be cached (pickled)
+            "venue": _materialize(dictified_dict.get("venue", None)),
             "year": int(dictified_dict.get("year", 0)),
             "authors": list(map(dict, list(dictified_dict.get("authors", [])))),
             "references": list(dictified_dict.get("references", [])),
@@ -136,27 +489,124 @@ class GenerateGraph:
 
         print(f"Saved graph to {gpickle_filename} file")
 
+    def cache_key(self) -> str:
+        """Hash of everything that determines the filtered set of papers"""
+        key = {
+            "version": VERSION,
+            "conference_ids": None if self.conference_ids is None else sorted(set(self.conference_ids)),
+            "min_year": self.min_year,
+            "max_year": self.max_year,
+            "fields": self.PAPER_FIELDS,
+        }
+        return hashlib.sha1(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def read_from_cache(self):
+        """
+        Fetch the filtered papers from the in-process cache or the on-disk one,
+        returning None if they weren't read before
+        """
+        cache_key = self.cache_key()
+        cached_key, conference_papers = GenerateGraph._cached_conference_papers
+        if cached_key == cache_key:
+            print("Reusing papers read by a previous graph generation")
+            return conference_papers
+
+        cache_filename = os.path.join(self.CACHE_PATH, f"{cache_key}.pickle")
+        if not os.path.exists(cache_filename):
+            return None
+
+        print(f"Reading papers from cache {cache_filename}")
+        with open(cache_filename, "rb") as f:
+            conference_papers = pickle.load(f)
+
+        GenerateGraph._cached_conference_papers = (cache_key, conference_papers)
+        return conference_papers
+
+    def save_to_cache(self, conference_papers: dict) -> None:
+        cache_key = self.cache_key()
+        cache_filename = os.path.join(self.CACHE_PATH, f"{cache_key}.pickle")
+
+        # Write to a temporary file first, so a crash never leaves a half written cache
+        os.makedirs(self.CACHE_PATH, exist_ok=True)
+        try:
+            with open(cache_filename + ".tmp", "wb") as f:
+                pickle.dump(conference_papers, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(cache_filename + ".tmp", cache_filename)
+        finally:
+            if os.path.exists(cache_filename + ".tmp"):
+                os.remove(cache_filename + ".tmp")
+
+        GenerateGraph._cached_conference_papers = (cache_key, conference_papers)
+        print(f"Saved papers to cache {cache_filename}")
+
     def read_from_dblp(self, read_saved_from_dblp: bool = False, save_from_dblp: bool = False) -> dict:
         """
         Fetch DBLP data and parse it properly
+
+        Unless `self.use_cache` is False, the filtered papers are cached on disk
+        (keyed by `cache_key`) and in memory, so they are only filtered once for
+        a given dataset, conferences and years, no matter the graph.
+
+        If the columnar paper store was built (see `paper_store.py`), papers
+        are read from it instead of streaming the whole JSON dump. Otherwise,
+        if the venue index was built (see `venue_index.py`), only the records of
+        `self.conference_ids` are read from the dump. Otherwise, with
+        `self.parallel_ingest` the dump is split in shards which are decoded
+        and filtered by a pool of `self.ingest_processes` workers
         """
 
         conference_papers = {}
 
         if read_saved_from_dblp:
-            json_filename = "../{}_{}.json".format(self.conference_name, self.graph_name)
-            with open(json_filename, "r") as f:
+            with open(self.saved_from_dblp_filename(), "r") as f:
                 conference_papers = json.load(f)
+        elif self.use_cache and (cached_conference_papers := self.read_from_cache()) is not None:
+            conference_papers = cached_conference_papers
+        else:
+            conference_papers = self.read_from_source()
+
+            # Only the years we generate graphs for are kept
+            conference_papers = {
+                year: papers for year, papers in conference_papers.items() if self.min_year <= int(year) < self.max_year
+            }
+
+            if self.use_cache:
+                self.save_to_cache(conference_papers)
+
+        if save_from_dblp:
+            with JSONStreamEncoder():
+                with open(self.saved_from_dblp_filename(), "w") as f:
+                    json.dump(conference_papers, f)
+
+        return conference_papers
+
+    def read_from_source(self) -> dict:
+        """Read and filter the papers from the paper store, the venue index or the DBLP dump"""
+
+        conference_papers = {}
+
+        if PaperStore.exists(self.PAPER_STORE_PATH):
+            print(f"Reading papers from store {self.PAPER_STORE_PATH}")
+            conference_papers = PaperStore(self.PAPER_STORE_PATH).read_conference_papers(self.conference_ids)
+        elif self.conference_ids is not None and VenueIndex.exists(self.VENUE_INDEX_PATH, self.DBLP_FILENAME):
+            print(f"Reading papers through venue index {self.VENUE_INDEX_PATH}")
+            venue_index = VenueIndex(self.VENUE_INDEX_PATH)
+            for line in venue_index.read_records(self.DBLP_FILENAME, self.conference_ids):
+                try:
+                    conference_papers.setdefault(line["year"], []).append(GenerateGraph.get_data(line))
+                except KeyError:
+                    pass
+        elif self.parallel_ingest:
+            conference_papers = read_dblp_parallel(self.DBLP_FILENAME, self.conference_ids, self.ingest_processes)
         else:
+            venue_filter = None if self.conference_ids is None else VenueFilter(self.conference_ids)
             with open(self.DBLP_FILENAME, "r") as f:
                 progress = tqdm(total=self.DATASET_SIZE, desc="Total")
                 error_progress = tqdm(desc="Errors")
                 success_progress = tqdm(desc="Success")
                 for line in json_stream.load(f).persistent():
                     try:
-                        if self.conference_ids is None or (
-                            line["venue"]["raw"] is not None and line["venue"]["raw"].lower() in self.conference_ids
-                        ):
+                        if venue_filter is None or venue_filter(line["venue"]["raw"]):
                             # If doesn't have year in the dictionary
                             if line["year"] not in conference_papers:
                                 conference_papers[line["year"]] = []
@@ -169,24 +619,33 @@ class GenerateGraph:
                     finally:
                         progress.update(1)
 
-        if save_from_dblp:
-            json_filename = "../data/dblp_arnet_{}_{}.json".format(self.conference_name, self.graph_name)
-            with JSONStreamEncoder():
-                with open(json_filename, "w") as f:
-                    json.dump(conference_papers, f, indent=4)
-
         return conference_papers
 
+    def saved_from_dblp_filename(self) -> str:
+        """File written by `save_from_dblp`, and read by `read_saved_from_dblp` and `read_from_json`"""
+        return "../data/dblp_arnet_{}_{}.json".format(self.conference_name, self.graph_name)
+
     def read_from_json(self) -> dict:
-        json_filename = "../data/dblp_arnet_{}_{}.json".format(self.conference_name, self.graph_name)
-        with open(json_filename, "r") as f:
+        with open(self.saved_from_dblp_filename(), "r") as f:
             conference_papers = json.load(f)
 
         return conference_papers
 
+    def temporal_store_path(self) -> str:
+        return self.TEMPORAL_BASE_PATH + "{}_{}".format(self.graph_name, self.conference_name)
+
     def read_from_gpickle(self, year: int) -> nx.DiGraph():
+        """Read the graph of `year`, from the temporal store if there is one, otherwise from its gpickle"""
+        if TemporalGraphStore.exists(self.temporal_store_path()):
+            if self.temporal_store is None:
+                self.temporal_store = TemporalGraphStore(self.temporal_store_path())
+
+            print(f"Reading graph of year {year} from temporal store {self.temporal_store_path()}")
+            self.G = self.temporal_store.as_of(year)
+            return
+
         gpickle_filename = self.GML_BASE_PATH + "{}_{}_{}_graph.gpickle".format(
-            self.conference_name, year, self.graph_name
+            self.graph_name, self.conference_name, year
         )
         print(f"Reading graph from GML file {gpickle_filename}")
 
@@ -198,24 +657,122 @@ class GenerateGraph:
             print("Generating empty graph, as there is no file")
 
     def compute_centralities(
-        self, degree=False, betweenness=False, closeness=False, pagerank=False, G: nx.Graph = None
+        self,
+        degree=False,
+        betweenness=False,
+        closeness=False,
+        pagerank=False,
+        G: nx.Graph = None,
+        betweenness_k: int = None,
+        betweenness_epsilon: float = None,
+        snapshot_name: str = None,
+        resume: bool = False,
+        address: str = None,
+        shared_dir: str = None,
+        workers: int = None,
     ):
+        """
+        Set the asked centralities as node attributes of G. With a `snapshot_name`, the
+        source ranges done of the long ones are checkpointed under `CHECKPOINT_BASE_PATH`,
+        and each one finished is saved there before its ranges are removed. If `resume`,
+        finished ones (also those of snapshots saved whole) are read back instead of being
+        computed again, and so are done ranges of the others. The centralities of G are also
+        saved as columns under `CENTRALITY_BASE_PATH`. With an `address`, those source ranges
+        are run by `workers` in other hosts, otherwise by `workers` (every core, by default) in this one
+        """
         # Check for default G
         if G is None:
             G = self.G
 
+        distributed = {"processes": workers, "address": address, "shared_dir": shared_dir}
+
+        # What a saved centrality must have been computed on (and how) to be read back
+        saved_for = lambda: {
+            "snapshot": snapshot_name,
+            "edges": G.number_of_edges(),
+            "betweenness_k": betweenness_k,
+            "betweenness_epsilon": betweenness_epsilon,
+        }
+
+        def run(measure: str, metrics: tuple, compute, **options) -> None:
+            """Compute the `metrics` of `measure`, unless resuming a snapshot where they are finished"""
+            if not snapshot_name:
+                compute(G=G, **options, **distributed)
+                return
+
+            checkpoint_dir = os.path.join(self.CHECKPOINT_BASE_PATH, snapshot_name, measure)
+            finished = os.path.join(self.CHECKPOINT_BASE_PATH, snapshot_name, "finished", measure)
+            saved = os.path.join(self.CENTRALITY_BASE_PATH, snapshot_name)
+            if resume and any(
+                self.load_finished_centralities(G, metrics, path, saved_for()) for path in (finished, saved)
+            ):
+                print(f"Read back the finished {measure} of {snapshot_name}")
+                return
+
+            compute(G=G, checkpoint_dir=checkpoint_dir, resume=resume, **options, **distributed)
+            CentralityStore.save(
+                finished, G, metrics, betweenness_error=G.graph.get("betweenness_error"), **saved_for()
+            )
+            shutil.rmtree(checkpoint_dir, ignore_errors=True)
+
         if degree:
             self.compute_degree(G=G)
 
-        if betweenness:
-            self.compute_betweeness(G=G)
-
-        if closeness:
-            self.compute_closeness(G=G)
+        # Both come from the same shortest paths sweep, unless betweenness is approximated
+        if betweenness and closeness and betweenness_k is None and betweenness_epsilon is None:
+            run("fused", ("betweenness", "closeness", "harmonic"), self.compute_fused_centralities)
+        else:
+            if betweenness:
+                run(
+                    "betweenness",
+                    ("betweenness",),
+                    self.compute_betweeness,
+                    k=betweenness_k,
+                    epsilon=betweenness_epsilon,
+                )
+
+            if closeness:
+                run("closeness", ("closeness",), self.compute_closeness)
 
         if pagerank:
             self.compute_pagerank(G=G)
 
+        if snapshot_name:
+            CentralityStore.save(
+                os.path.join(self.CENTRALITY_BASE_PATH, snapshot_name),
+                G,
+                self.CENTRALITY_ATTRIBUTES,
+                betweenness_error=G.graph.get("betweenness_error"),
+                **saved_for(),
+            )
+
+            # Every measure is saved with the others, so none of their checkpoints is needed anymore
+            shutil.rmtree(os.path.join(self.CHECKPOINT_BASE_PATH, snapshot_name), ignore_errors=True)
+
+    @staticmethod
+    def load_finished_centralities(G: nx.Graph, metrics: tuple, path: str, saved_for: dict) -> bool:
+        """Set the `metrics` saved at `path` as node attributes of G, if saved for the same graph and options"""
+        if not CentralityStore.exists(path):
+            return False
+
+        store = CentralityStore(path)
+        nodes = list(G)
+        node_ids = store.node_ids()
+        if (
+            not set(metrics) <= set(store.metrics)
+            or any(store.manifest.get(key) != value for key, value in saved_for.items())
+            or node_ids.tolist() != (nodes if node_ids.dtype.kind == "i" else [str(node) for node in nodes])
+        ):
+            return False
+
+        for metric in metrics:
+            nx.set_node_attributes(G, dict(zip(nodes, store.column(metric).tolist())), metric)
+        if "betweenness" in metrics:
+            G.graph.pop("betweenness_error", None)
+            if store.manifest.get("betweenness_error") is not None:
+                G.graph["betweenness_error"] = store.manifest["betweenness_error"]
+        return True
+
     def compute_degree(self, in_degree=True, out_degree=True, G: nx.Graph = None):
 
         # Check for default G
@@ -236,38 +793,90 @@ class GenerateGraph:
             out_degree_data = {node: degree for node, degree in list(G.out_degree)}
             nx.set_node_attributes(G, out_degree_data, "outdegree")
 
-    def compute_betweeness(self, G: nx.Graph = None):
+    def compute_betweeness(
+        self,
+        G: nx.Graph = None,
+        k: int = None,
+        epsilon: float = None,
+        checkpoint_dir: str = None,
+        resume: bool = False,
+        processes: int = None,
+        address: str = None,
+        shared_dir: str = None,
+    ):
+        """Betweenness of G, approximated from `k` pivots (or enough for an `epsilon` error) if given"""
         # Check for default G
         if G is None:
             G = self.G
 
-        betweenness = betweenness_centrality_parallel(G)
+        betweenness = betweenness_centrality_parallel(
+            G,
+            k=k,
+            epsilon=epsilon,
+            checkpoint_dir=checkpoint_dir,
+            resume=resume,
+            processes=processes,
+            address=address,
+            shared_dir=shared_dir,
+        )
         nx.set_node_attributes(G, betweenness, "betweenness")
 
-    def compute_closeness(self, G: nx.Graph = None):
+    def compute_closeness(
+        self,
+        G: nx.Graph = None,
+        checkpoint_dir: str = None,
+        resume: bool = False,
+        processes: int = None,
+        address: str = None,
+        shared_dir: str = None,
+    ):
         # Check for default G
         if G is None:
             G = self.G
 
-        closeness = closeness_centrality_parallel(G)
+        closeness = closeness_centrality_parallel(
+            G, processes, checkpoint_dir=checkpoint_dir, resume=resume, address=address, shared_dir=shared_dir
+        )
         nx.set_node_attributes(G, closeness, "closeness")
 
+    def compute_fused_centralities(
+        self,
+        G: nx.Graph = None,
+        checkpoint_dir: str = None,
+        resume: bool = False,
+        processes: int = None,
+        address: str = None,
+        shared_dir: str = None,
+    ):
+        """Betweenness, closeness and harmonic centrality of G, from a single pass over its sources"""
+        # Check for default G
+        if G is None:
+            G = self.G
+
+        print("Generating betweenness, closeness and harmonic")
+        csr = CSRGraph.from_networkx(G)
+        centralities = fused_centralities(
+            csr, processes, checkpoint_dir=checkpoint_dir, resume=resume, address=address, shared_dir=shared_dir
+        )
+        for centrality, scores in centralities.items():
+            nx.set_node_attributes(G, dict(zip(csr.nodes, scores.tolist())), centrality)
+        G.graph.pop("betweenness_error", None)
+
     def compute_pagerank(self, G: nx.Graph = None):
         # Check for default G
         if G is None:
             G = self.G
 
         print("Generating pagerank")
-        try:
-            pagerank = nx.pagerank(G)
-        except nx.exception.NetworkXNotImplemented:
-            print(
-                "Not implemented pagerank for MultiGraph. \
-                   Converting to normal graph"
-            )
-            pagerank = nx.pagerank(nx.DiGraph(G))
 
-        nx.set_node_attributes(G, pagerank, "pagerank")
+        # Parallel edges of multigraphs count as weights
+        if G is self.G:
+            scores = self.incremental_pagerank(G)
+            print(f"Pagerank converged in {self.incremental_pagerank.iterations} iterations")
+        else:
+            scores = pagerank(G)
+
+        nx.set_node_attributes(G, scores, "pagerank")
 
 
 # endclass GenerateGraph
@@ -280,12 +889,44 @@ def generate_graph(
     run_authors_citation_graph: bool = False,
     run_country_citation_graph: bool = False,
     conference_name: str = "CsRankings-IA",
+    build_paper_store: bool = False,
+    build_venue_index: bool = False,
+    parallel_ingest: bool = False,
+    ingest_processes: int = None,
+    use_cache: bool = True,
+    dense_ids: bool = True,
+    fused: bool = False,
+    aggregate_authors_citation: bool = False,
+    aggregate_countries_citation: bool = False,
     **kwargs: dict,
 ) -> None:
     """
     Run the required authors generation
+
+    With `build_paper_store`, the DBLP dump is first converted to the columnar
+    paper store, which every later `read_from_dblp` call reads from instead.
+    With `build_venue_index`, the venue -> records offsets index of the dump is
+    built, so that later reads only decode the papers of the conference set.
+    With `parallel_ingest`, the JSON dump is read by `ingest_processes` workers.
+    The filtered papers are read only once and shared by every graph, unless
+    `use_cache` is False. Unless `dense_ids` is False, graph nodes are the dense
+    int ids of the papers and authors (see `id_dictionary.py`). With `fused`, every graph is built in the same pass
+    over the years (see `generate_fused`). With `aggregate_authors_citation`, the authors
+    citation graph has a single edge per pair of authors, weighted by the amount of citations,
+    and likewise for the countries citation graph with `aggregate_countries_citation`
     """
 
+    fused_generations = []
+
+    if build_paper_store:
+        # Configure to current directory, as the generators do
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+        PaperStore.build(GenerateGraph.DBLP_FILENAME, GenerateGraph.PAPER_STORE_PATH, total=GenerateGraph.DATASET_SIZE)
+
+    if build_venue_index:
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+        VenueIndex.build(GenerateGraph.DBLP_FILENAME, GenerateGraph.VENUE_INDEX_PATH, processes=ingest_processes)
+
     if run_authors_and_papers_graph:
         from generate_authors_and_papers_graph import AuthorPaperGraph
 
@@ -293,11 +934,18 @@ def generate_graph(
             graph_name="author_paper",
             conference_name=conference_name,
             conference_ids=CONFERENCE_IDS.get(conference_name, None),
+            parallel_ingest=parallel_ingest,
+            ingest_processes=ingest_processes,
+            use_cache=use_cache,
+            dense_ids=dense_ids,
         )
 
-        print("Starting AuthorPaperGraph generation")
-        graphGeneration.generate(**kwargs)
-        del graphGeneration
+        if fused:
+            fused_generations.append(graphGeneration)
+        else:
+            print("Starting AuthorPaperGraph generation")
+            graphGeneration.generate(**kwargs)
+            del graphGeneration
 
     if run_collaboration_graph:
         from generate_collaboration_graph import CollaborationGraph
@@ -306,11 +954,18 @@ def generate_graph(
             graph_name="collaboration",
             conference_name=conference_name,
             conference_ids=CONFERENCE_IDS.get(conference_name, None),
+            parallel_ingest=parallel_ingest,
+            ingest_processes=ingest_processes,
+            use_cache=use_cache,
+            dense_ids=dense_ids,
         )
 
-        print("Starting CollaborationGraph generation")
-        graphGeneration.generate(**kwargs)
-        del graphGeneration
+        if fused:
+            fused_generations.append(graphGeneration)
+        else:
+            print("Starting CollaborationGraph generation")
+            graphGeneration.generate(**kwargs)
+            del graphGeneration
 
     if run_citation_graph:
         from generate_citation_graph import CitationGraph
@@ -319,11 +974,18 @@ def generate_graph(
             graph_name="citation",
             conference_name=conference_name,
             conference_ids=CONFERENCE_IDS.get(conference_name, None),
+            parallel_ingest=parallel_ingest,
+            ingest_processes=ingest_processes,
+            use_cache=use_cache,
+            dense_ids=dense_ids,
         )
 
-        print("Starting CitationGraph generation")
-        graphGeneration.generate(**kwargs)
-        del graphGeneration
+        if fused:
+            fused_generations.append(graphGeneration)
+        else:
+            print("Starting CitationGraph generation")
+            graphGeneration.generate(**kwargs)
+            del graphGeneration
 
     if run_authors_citation_graph:
         from generate_authors_citation_graph import AuthorsCitationGraph
@@ -332,11 +994,19 @@ def generate_graph(
             graph_name="authors_citation",
             conference_name=conference_name,
             conference_ids=CONFERENCE_IDS.get(conference_name, None),
+            parallel_ingest=parallel_ingest,
+            ingest_processes=ingest_processes,
+            use_cache=use_cache,
+            dense_ids=dense_ids,
+            aggregated=aggregate_authors_citation,
         )
 
-        print("Starting AuthorsCitationGraph generation")
-        graphGeneration.generate(**kwargs)
-        del graphGeneration
+        if fused:
+            fused_generations.append(graphGeneration)
+        else:
+            print("Starting AuthorsCitationGraph generation")
+            graphGeneration.generate(**kwargs)
+            del graphGeneration
 
     if run_country_citation_graph:
         from generate_country_citation_graph import CountryCitationGraph
@@ -345,11 +1015,48 @@ def generate_graph(
             graph_name="countries_citation",
             conference_name=conference_name,
             conference_ids=CONFERENCE_IDS.get(conference_name, None),
+            parallel_ingest=parallel_ingest,
+            ingest_processes=ingest_processes,
+            use_cache=use_cache,
+            dense_ids=dense_ids,
+            aggregated=aggregate_countries_citation,
         )
 
-        print("Starting CountryCitationGraph generation")
-        graphGeneration.generate(**kwargs)
-        del graphGeneration
+        if fused:
+            fused_generations.append(graphGeneration)
+        else:
+            print("Starting CountryCitationGraph generation")
+            graphGeneration.generate(**kwargs)
+            del graphGeneration
+
+    if fused_generations:
+        generate_fused(fused_generations, **kwargs)
+
+
+def generate_fused(graph_generations: List[GenerateGraph], **kwargs: dict) -> None:
+    """
+    Generate several graphs at once: the papers are read a single time (with the
+    read options of the first graph), and each year batch of papers is fed to
+    every graph before moving to the next year
+    """
+    print("Starting fused generation of", ", ".join(type(generation).__name__ for generation in graph_generations))
+
+    options = [generation.generation_options(**kwargs) for generation in graph_generations]
+    conference_papers = graph_generations[0].read_papers(**options[0])
+
+    registry = PaperRegistry()
+    for generation in graph_generations:
+        generation.start_generation(registry=registry)
+
+    min_year = min(generation.min_year for generation in graph_generations)
+    max_year = max(generation.max_year for generation in graph_generations)
+    for year in range(min_year, max_year):
+        for generation, generation_options in zip(graph_generations, options):
+            if generation.min_year <= year < generation.max_year:
+                generation.generate_year(year, conference_papers, **generation_options)
+
+    for generation, generation_options in zip(graph_generations, options):
+        generation.finish_generation(conference_papers, **generation_options)
 
 
 if __name__ == "__main__":
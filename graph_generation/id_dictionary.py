@@ -0,0 +1,121 @@
+# Dense integer ids for papers and authors
+#
+# Paper and author ids are long strings, hashed and stored again in every graph
+# and every dict we build. This dictionary maps them, once, to dense int32 ids
+# (papers and authors share the same id space, so they never collide in graphs
+# with both), and is persisted so the ids are stable between runs. It is saved to a
+# temporary directory swapped in place, like the papers cache, as graphs saved with
+# the dense ids can't be read back without the exact dictionary they were made with.
+
+# Core imports
+import json
+import os
+import shutil
+from typing import Iterable, List
+
+# Library imports
+import numpy as np
+
+from paper_store import StringTable
+
+
+class IdDictionary:
+    """Append-only mapping between original string ids and dense int ids"""
+
+    def __init__(self, ids: List[str] = None):
+        self.ids: List[str] = list(ids or [])
+        self.index = {original: dense for dense, original in enumerate(self.ids)}
+        self.saved_size = len(self.ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __call__(self, original: str) -> int:
+        """Dense id of `original`, adding it to the dictionary if needed"""
+        dense = self.index.get(original)
+        if dense is None:
+            dense = self.index[original] = len(self.ids)
+            self.ids.append(original)
+        return dense
+
+    def to_original(self, dense: int) -> str:
+        """Reverse lookup, from a dense id to the original string id"""
+        return self.ids[dense]
+
+    def decode(self, dense_ids: Iterable[int]) -> List[str]:
+        return [self.ids[dense] for dense in dense_ids]
+
+    def encode_papers(self, conference_papers: dict) -> dict:
+        """Copy of the year-keyed papers, with paper, author and reference ids made dense"""
+        return {
+            year: [
+                {
+                    **paper,
+                    "id": self(paper["id"]),
+                    "authors": [
+                        {**author, "id": self(author["id"])} if "id" in author else author
+                        for author in paper["authors"]
+                    ],
+                    "references": [self(reference) for reference in paper["references"]],
+                }
+                for paper in papers
+            ]
+            for year, papers in conference_papers.items()
+        }
+
+    def save(self, path: str) -> None:
+        """
+        Persist the dictionary, if it grew since it was loaded. It is written whole to a
+        temporary directory, then swapped in place, so a save never leaves it half written
+        """
+        if len(self.ids) == self.saved_size and IdDictionary.exists(path):
+            return
+
+        if len(self.ids) > np.iinfo(np.int32).max:
+            raise OverflowError("Too many ids to be represented as int32")
+
+        # Another run may have saved ids since this one loaded them, which its graphs already use
+        if IdDictionary.exists(path) and IdDictionary.saved_length(path) != self.saved_size:
+            saved = StringTable.load(path, "ids")
+            if len(saved) > len(self.ids) or saved.to_list() != self.ids[: len(saved)]:
+                raise RuntimeError(f"The id dictionary at {path} was saved by another run since it was loaded")
+
+        temporary, previous = f"{path}.{os.getpid()}.tmp", f"{path}.{os.getpid()}.old"
+        try:
+            os.makedirs(temporary, exist_ok=True)
+            StringTable.save(temporary, "ids", self.ids)
+            with open(os.path.join(temporary, "manifest.json"), "w") as f:
+                json.dump({"ids": len(self.ids)}, f)
+
+            # A directory can't replace a non empty one, so the saved one is moved away first
+            if os.path.isdir(path):
+                os.replace(path, previous)
+            try:
+                os.replace(temporary, path)
+            except OSError:
+                if os.path.isdir(previous) and not os.path.exists(path):
+                    os.replace(previous, path)
+                raise
+        finally:
+            shutil.rmtree(temporary, ignore_errors=True)
+            shutil.rmtree(previous, ignore_errors=True)
+
+        self.saved_size = len(self.ids)
+        print(f"Saved id dictionary with {len(self.ids)} ids to {path}")
+
+    @staticmethod
+    def saved_length(path: str) -> int:
+        with open(os.path.join(path, "manifest.json"), "r") as f:
+            return json.load(f)["ids"]
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.isfile(os.path.join(path, "manifest.json"))
+
+    @staticmethod
+    def load(path: str) -> "IdDictionary":
+        """Load the dictionary saved at `path`, or start an empty one"""
+        if not IdDictionary.exists(path):
+            return IdDictionary()
+
+        return IdDictionary(StringTable.load(path, "ids").to_list())
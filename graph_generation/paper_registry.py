@@ -0,0 +1,56 @@
+# Registry of the papers already added to a graph
+#
+# Every generator needs to know, when linking a paper to the papers it cites,
+# whether the cited paper was already published (and who wrote it). This keeps
+# them in a dict, so membership checks are O(1) even on the "all" conference set.
+
+# Core imports
+from typing import Iterator, List, Optional
+
+
+class PaperRegistry:
+    """Papers registered so far, by id, along with their year, authors and venue"""
+
+    def __init__(self):
+        self.papers = {}
+        self.by_year = {}
+
+    def __contains__(self, paper_id) -> bool:
+        return paper_id in self.papers
+
+    def __len__(self) -> int:
+        return len(self.papers)
+
+    def add(self, paper: dict) -> None:
+        """Register a paper, doing nothing if it was already registered"""
+        if paper["id"] not in self.papers:
+            self.papers[paper["id"]] = paper
+            self.by_year.setdefault(paper["year"], []).append(paper["id"])
+
+    def add_papers(self, papers: List[dict]) -> None:
+        for paper in papers:
+            self.add(paper)
+
+    def get(self, paper_id) -> Optional[dict]:
+        return self.papers.get(paper_id)
+
+    def year_of(self, paper_id) -> int:
+        return self.papers[paper_id]["year"]
+
+    def authors_of(self, paper_id) -> List[dict]:
+        return self.papers[paper_id]["authors"]
+
+    def venue_of(self, paper_id) -> Optional[dict]:
+        return self.papers[paper_id].get("venue")
+
+    def published_by(self, paper_id, year: int) -> bool:
+        """Whether the paper is registered and was published up to `year`"""
+        paper = self.papers.get(paper_id)
+        return paper is not None and paper["year"] <= year
+
+    def papers_up_to(self, year: int) -> Iterator:
+        """Ids of the registered papers published up to `year`"""
+        for paper_year in sorted(self.by_year):
+            if paper_year > year:
+                return
+            yield from self.by_year[paper_year]
@@ -0,0 +1,328 @@
+# Columnar paper store, built once from the DBLP arnet dump
+#
+# Parsing the full JSON dump takes far longer than any graph we build from it,
+# so this module converts it, once, to a directory of `.npy` columns which can
+# be memory mapped. Variable length data (strings, authors, references) is
+# stored as an offsets array plus a values array, so reading a paper is just
+# slicing a few arrays.
+
+# Core imports
+import json
+import os
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Library imports
+import fire
+import json_stream
+import numpy as np
+from tqdm import tqdm
+
+STORE_FORMAT_VERSION = 1
+
+
+class StringTable:
+    """Read-only table of strings stored as utf-8 bytes plus offsets"""
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return bytes(self.data[self.offsets[index] : self.offsets[index + 1]]).decode("utf-8")
+
+    def to_list(self) -> List[str]:
+        data = bytes(self.data)
+        offsets = self.offsets.tolist()
+        return [data[offsets[i] : offsets[i + 1]].decode("utf-8") for i in range(len(self))]
+
+    @staticmethod
+    def save(path: str, name: str, strings: Iterable[str]) -> None:
+        encoded = [string.encode("utf-8") for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(string) for string in encoded], out=offsets[1:])
+
+        np.save(os.path.join(path, f"{name}.offsets.npy"), offsets)
+        np.save(os.path.join(path, f"{name}.data.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+
+    @staticmethod
+    def load(path: str, name: str, mmap_mode: Optional[str] = "r") -> "StringTable":
+        offsets = np.load(os.path.join(path, f"{name}.offsets.npy"), mmap_mode=mmap_mode)
+        data = np.load(os.path.join(path, f"{name}.data.npy"), mmap_mode=mmap_mode)
+        return StringTable(offsets, data)
+
+
+class _Interner:
+    """Map strings to dense indexes, in order of first appearance"""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+
+    def __call__(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+
+        position = self.index.get(value)
+        if position is None:
+            position = self.index[value] = len(self.index)
+        return position
+
+    def strings(self) -> List[str]:
+        return list(self.index.keys())
+
+
+def _materialize(value):
+    """Recursively turn streamed json_stream containers into standard types"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if hasattr(value, "items"):
+        return {key: _materialize(item) for key, item in value.items()}
+    return [_materialize(item) for item in value]
+
+
+def iter_dblp_records(filename: str) -> Iterator[dict]:
+    """
+    Stream the records of a DBLP arnet dump, be it a JSON array (v12+)
+    or a file with one JSON object per line (v11 and earlier)
+    """
+    with open(filename, "r") as f:
+        first_char = f.read(1)
+        while first_char.isspace():
+            first_char = f.read(1)
+        f.seek(0)
+
+        if first_char == "[":
+            for line in json_stream.load(f).persistent():
+                yield _materialize(line)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class PaperStore:
+    """
+    Memory mapped, columnar view of every paper in a DBLP arnet dump.
+
+    Columns (one row per paper):
+        paper_id     index into the `ids` table
+        year         publication year, 0 when unknown
+        venue        index into the `venues` table (raw venue string), -1 if none
+        venue_id     index into the `venue_ids` table, -1 if none
+        doc_type     index into the `doc_types` table, -1 if none
+        title        `titles` string table
+        authors      offsets + values, values index the author tables
+        orgs         organization of each authorship, aligned with authors values
+        references   offsets + values, values index the `ids` table
+
+    The `ids` table holds every paper id seen, including referenced papers which
+    are not in the dump. `row_of_id` maps an `ids` index back to its row (or -1).
+    """
+
+    def __init__(self, path: str, mmap_mode: Optional[str] = "r"):
+        self.path = path
+
+        with open(os.path.join(path, "manifest.json"), "r") as f:
+            self.manifest = json.load(f)
+
+        def column(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+        self.paper_id = column("paper_id")
+        self.row_of_id = column("row_of_id")
+        self.year = column("year")
+        self.venue = column("venue")
+        self.venue_id = column("venue_id")
+        self.doc_type = column("doc_type")
+        self.authors_offsets = column("authors.offsets")
+        self.authors_values = column("authors.values")
+        self.authors_orgs = column("authors.orgs")
+        self.references_offsets = column("references.offsets")
+        self.references_values = column("references.values")
+
+        self.ids = StringTable.load(path, "ids", mmap_mode)
+        self.titles = StringTable.load(path, "titles", mmap_mode)
+        self.author_ids = StringTable.load(path, "author_ids", mmap_mode)
+        self.author_names = StringTable.load(path, "author_names", mmap_mode)
+        self.orgs = StringTable.load(path, "orgs", mmap_mode)
+
+        # Small tables, worth keeping as python lists
+        self.venues = StringTable.load(path, "venues", mmap_mode).to_list()
+        self.venue_ids = StringTable.load(path, "venue_ids", mmap_mode).to_list()
+        self.doc_types = StringTable.load(path, "doc_types", mmap_mode).to_list()
+
+    def __len__(self) -> int:
+        return len(self.year)
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.isfile(os.path.join(path, "manifest.json"))
+
+    def rows_for_venues(self, conference_ids: Optional[List[str]] = None) -> np.ndarray:
+        """
+        Rows of the papers whose venue is kept by `conference_ids` (see `VenueFilter`),
+        or every row when `conference_ids` is None
+        """
+        if conference_ids is None:
+            return np.arange(len(self), dtype=np.int64)
+
+        # Imported here, so the root scripts can still import this module from the package
+        from venue_classifier import VenueFilter
+
+        venue_filter = VenueFilter(conference_ids)
+        venue_mask = np.array([venue_filter(venue) for venue in self.venues] + [False], dtype=bool)
+
+        # `venue == -1` (no venue) falls in the extra False entry at the end
+        return np.flatnonzero(venue_mask[self.venue])
+
+    def rows_for_venue_ids(self, venue_ids: List[str]) -> np.ndarray:
+        """Rows of the papers whose venue id is in `venue_ids`"""
+        venue_ids = set(venue_ids)
+        venue_mask = np.array([venue_id in venue_ids for venue_id in self.venue_ids] + [False], dtype=bool)
+
+        return np.flatnonzero(venue_mask[self.venue_id])
+
+    def get_data(self, row: int) -> dict:
+        """Build the same dict `GenerateGraph.get_data` would build for this paper"""
+        authors_start, authors_end = self.authors_offsets[row], self.authors_offsets[row + 1]
+        references_start, references_end = self.references_offsets[row], self.references_offsets[row + 1]
+        venue, venue_id = self.venue[row], self.venue_id[row]
+
+        return {
+            "id": self.ids[self.paper_id[row]],
+            "title": self.titles[row],
+            "venue": (
+                None
+                if venue < 0
+                else {"raw": self.venues[venue], "id": self.venue_ids[venue_id] if venue_id >= 0 else None}
+            ),
+            "year": int(self.year[row]),
+            "authors": [
+                {
+                    "id": self.author_ids[author],
+                    "name": self.author_names[author],
+                    "org": self.orgs[org] if org >= 0 else "",
+                }
+                for author, org in zip(
+                    self.authors_values[authors_start:authors_end].tolist(),
+                    self.authors_orgs[authors_start:authors_end].tolist(),
+                )
+            ],
+            "references": [
+                self.ids[reference] for reference in self.references_values[references_start:references_end]
+            ],
+        }
+
+    def read_conference_papers(self, conference_ids: Optional[List[str]] = None, rows: np.ndarray = None) -> dict:
+        """Year-keyed dict of papers, as returned by `GenerateGraph.read_from_dblp`"""
+        if rows is None:
+            rows = self.rows_for_venues(conference_ids)
+
+        conference_papers = {}
+        for row in tqdm(rows.tolist(), desc="Reading from store"):
+            paper = self.get_data(row)
+            conference_papers.setdefault(paper["year"], []).append(paper)
+
+        return conference_papers
+
+    @staticmethod
+    def build(filename: str, path: str, total: Optional[int] = None) -> "PaperStore":
+        """Convert the DBLP dump at `filename` to a store at `path`"""
+        os.makedirs(path, exist_ok=True)
+
+        ids, author_ids, orgs = _Interner(), _Interner(), _Interner()
+        venues, venue_ids, doc_types = _Interner(), _Interner(), _Interner()
+        author_names: List[str] = []
+        titles: List[str] = []
+
+        paper_id, year, venue, venue_id, doc_type = array("i"), array("h"), array("i"), array("i"), array("i")
+        authors_offsets, authors_values, authors_orgs = array("q", [0]), array("i"), array("i")
+        references_offsets, references_values = array("q", [0]), array("i")
+
+        for record in tqdm(iter_dblp_records(filename), total=total, desc="Building paper store"):
+            venue_data = record.get("venue") or {}
+
+            paper_id.append(ids(str(record.get("_id", record.get("id", 0)))))
+            year.append(int(record.get("year", 0) or 0))
+            venue.append(venues(venue_data.get("raw")))
+            venue_id.append(venue_ids(venue_data.get("_id", venue_data.get("id"))))
+            doc_type.append(doc_types(record.get("doc_type")))
+            titles.append(record.get("title") or "")
+
+            for author in record.get("authors", []):
+                # Authors without an id would all be interned as the same ("") author
+                author_id = author.get("_id", author.get("id"))
+                if author_id is None or author_id == "":
+                    continue
+
+                author_index = author_ids(str(author_id))
+                if author_index == len(author_names):
+                    author_names.append(author.get("name", ""))
+
+                authors_values.append(author_index)
+                authors_orgs.append(orgs(author.get("org") or None))
+            authors_offsets.append(len(authors_values))
+
+            for reference in record.get("references", []):
+                references_values.append(ids(str(reference)))
+            references_offsets.append(len(references_values))
+
+        # Papers only referenced by others have no row
+        row_of_id = np.full(len(ids.index), -1, dtype=np.int32)
+        row_of_id[np.frombuffer(paper_id, dtype=np.int32)] = np.arange(len(paper_id), dtype=np.int32)
+
+        columns = {
+            "paper_id": np.frombuffer(paper_id, dtype=np.int32),
+            "row_of_id": row_of_id,
+            "year": np.frombuffer(year, dtype=np.int16),
+            "venue": np.frombuffer(venue, dtype=np.int32),
+            "venue_id": np.frombuffer(venue_id, dtype=np.int32),
+            "doc_type": np.frombuffer(doc_type, dtype=np.int32),
+            "authors.offsets": np.frombuffer(authors_offsets, dtype=np.int64),
+            "authors.values": np.frombuffer(authors_values, dtype=np.int32),
+            "authors.orgs": np.frombuffer(authors_orgs, dtype=np.int32),
+            "references.offsets": np.frombuffer(references_offsets, dtype=np.int64),
+            "references.values": np.frombuffer(references_values, dtype=np.int32),
+        }
+        for name, values in columns.items():
+            np.save(os.path.join(path, f"{name}.npy"), values)
+
+        StringTable.save(path, "ids", ids.strings())
+        StringTable.save(path, "titles", titles)
+        StringTable.save(path, "author_ids", author_ids.strings())
+        StringTable.save(path, "author_names", author_names)
+        StringTable.save(path, "orgs", orgs.strings())
+        StringTable.save(path, "venues", venues.strings())
+        StringTable.save(path, "venue_ids", venue_ids.strings())
+        StringTable.save(path, "doc_types", doc_types.strings())
+
+        # Written last, so an interrupted build is never mistaken for a store
+        with open(os.path.join(path, "manifest.json"), "w") as f:
+            json.dump(
+                {
+                    "format_version": STORE_FORMAT_VERSION,
+                    "source": os.path.abspath(filename),
+                    "papers": len(paper_id),
+                    "ids": len(ids.index),
+                    "authors": len(author_names),
+                    "authorships": len(authors_values),
+                    "references": len(references_values),
+                },
+                f,
+                indent=4,
+            )
+
+        print(f"Saved paper store with {len(paper_id)} papers to {path}")
+        return PaperStore(path)
+
+
+def build_paper_store(filename: str, path: str, total: int = None) -> None:
+    """Build a paper store at PATH from the DBLP arnet dump at FILENAME"""
+    PaperStore.build(filename, path, total)
+
+
+if __name__ == "__main__":
+    fire.Fire(build_paper_store)
@@ -1,50 +1,74 @@
-from multiprocessing import Pool
+import math
+import random
 import time
-import itertools
 
 import matplotlib.pyplot as plt
 import networkx as nx
 
+import numpy as np
 
-def _chunks(nodes, n_chunks):
-    """Divide a list of nodes `l` in `n` chunks"""
-    l_iterator = iter(nodes)
-    while True:
-        nodes_tuple = tuple(itertools.islice(l_iterator, n_chunks))
-        if not nodes_tuple:
-            return
-        yield nodes_tuple
+import centrality_engine
+from csr_graph import CSRGraph
 
 
-def _betmap(G_normalized_weight_sources_tuple):
-    """Pool for multiprocess only accepts functions with one argument.
-    This function uses a tuple as its only argument. We use a named tuple for
-    python 3 compatibility, and then unpack it when we send it to
-    `betweenness_centrality_source`
+def pivots_for(n, epsilon, delta=0.1):
+    """Amount of pivots so that, with probability 1 - `delta`, every node error is below `epsilon`"""
+    return math.ceil(math.log(2 * n / delta) / (2 * epsilon**2))
+
+
+def error_bound(n, k, delta=0.1):
+    """Error which, with probability 1 - `delta`, no node exceeds when sampling `k` pivots"""
+    return math.sqrt(math.log(2 * n / delta) / (2 * k))
+
+
+def betweenness_centrality_parallel(
+    G,
+    processes=None,
+    k=None,
+    epsilon=None,
+    delta=0.1,
+    seed=None,
+    checkpoint_dir=None,
+    resume=False,
+    address=None,
+    shared_dir=None,
+    **kwargs
+):
     """
-    return nx.betweenness_centrality_source(*G_normalized_weight_sources_tuple)
-
-
-def betweenness_centrality_parallel(G, processes=None, **kwargs):
-    """Parallel betweenness centrality  function"""
-    pool = Pool(processes=processes)
-    node_divisor = len(pool._pool) * 4
-    node_chunks = list(_chunks(G.nodes(), int(G.order() / node_divisor)))
-    num_chunks = len(node_chunks)
-    print("Generating betweenness in {} chunks in {} cores".format(num_chunks, len(pool._pool)))
-    betweenness_scores = pool.map(_betmap, zip([G] * num_chunks, [True] * num_chunks, [None] * num_chunks, node_chunks))
-
-    pool.close()  # Remember to close the process pool
-
-    # Reduce the partial solutions
-    if len(betweenness_scores) > 0:
-        betweenness_cumulator = betweenness_scores[0]
-        for betweenness in betweenness_scores[1:]:
-            for n in betweenness:
-                betweenness_cumulator[n] += betweenness[n]
-        return betweenness_cumulator
+    Parallel betweenness centrality function. With `k` (or an `epsilon` target error,
+    holding with probability 1 - `delta`) it is approximated from `k` random pivot sources,
+    scaled by n / k, and the error bound achieved is stored in `G.graph["betweenness_error"]`.
+    With a `checkpoint_dir`, finished source ranges are saved there, and skipped if `resume`d.
+    With an `address` ("host:port"), source ranges are served from it to workers on other
+    hosts (see `distributed_centrality.py`), reading G from `shared_dir`
+    """
+    n = G.order()
+    if epsilon is not None and k is None and n > 0:
+        k = pivots_for(n, epsilon, delta)
+
+    sources = list(G.nodes())
+    if k is not None and 0 < k < n:
+        sources = random.Random(seed).sample(sources, k)
+        G.graph["betweenness_error"] = error_bound(n, k, delta)
+        error = G.graph["betweenness_error"]
+        print(f"Approximating betweenness from {k} pivots, error below {error:.4f} with probability {1 - delta}")
     else:
-        return {}
+        G.graph.pop("betweenness_error", None)
+
+    # Workers share the graph as a CSR, and only get ranges of the sources
+    csr = CSRGraph.from_networkx(G)
+    position = {node: index for index, node in enumerate(csr.nodes)}
+    scores = centrality_engine.betweenness(
+        csr,
+        np.array([position[node] for node in sources]),
+        processes,
+        checkpoint_dir=checkpoint_dir,
+        resume=resume,
+        address=address,
+        shared_dir=shared_dir,
+    )
+
+    return dict(zip(csr.nodes, scores.tolist()))
 
 
 if __name__ == "__main__":
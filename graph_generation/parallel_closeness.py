@@ -1,68 +1,46 @@
-from multiprocessing import Pool
 import time
-import itertools
 import functools
 
 import matplotlib.pyplot as plt
 import networkx as nx
 
-from pprint import pprint as pp
-
+import centrality_engine
+from csr_graph import CSRGraph
 
-def _chunks(nodes, n_chunks):
-    """Divide a list of nodes `l` in `n` chunks"""
-    l_iterator = iter(nodes)
-    while True:
-        nodes_tuple = tuple(itertools.islice(l_iterator, n_chunks))
-        if not nodes_tuple:
-            return
-        yield nodes_tuple
+from pprint import pprint as pp
 
 
-def _betmap(G):
-    """Pool for multiprocess only accepts functions with one argument.
-    This function uses a tuple as its only argument. We use a named tuple for
-    python 3 compatibility, and then unpack it when we send it to
-    `betweenness_centrality_source`
+def closeness_centrality_parallel(
+    G,
+    processes=None,
+    wf_improved=True,
+    bit_parallel=True,
+    checkpoint_dir=None,
+    resume=False,
+    address=None,
+    shared_dir=None,
+    **kwargs
+):
     """
-    centrality = closeness_centrality(*G[:-1])
-
-    return centrality
-
-
-def closeness_centrality_parallel(G, processes=None, **kwargs):
-    """Parallel closeness centrality function"""
-    pool = Pool(processes=processes)
-    node_divisor = len(pool._pool) * 4
-    node_chunks = list(_chunks(G.nodes(), int(G.order() / node_divisor)))
-    num_chunks = len(node_chunks)
-    print("Generating closeness in {} chunks in {} cores".format(num_chunks, len(pool._pool)))
-    graphs = [G] * num_chunks
-    closeness_scores = pool.map(
-        _betmap,
-        zip(
-            graphs,
-            node_chunks,
-            [None] * num_chunks,
-            [True] * num_chunks,
-            [(x + 1, num_chunks) for x in range(num_chunks)],
-        ),
+    Parallel closeness centrality function, with workers sharing the graph as a CSR,
+    and running the BFS of 64 sources at once unless not `bit_parallel`.
+    With a `checkpoint_dir`, finished source ranges are saved there, and skipped if `resume`d.
+    With an `address` ("host:port"), source ranges are served from it to workers on other
+    hosts (see `distributed_centrality.py`), reading G from `shared_dir`
+    """
+    csr = CSRGraph.from_networkx(G)
+    scores = centrality_engine.closeness(
+        csr,
+        processes,
+        wf_improved,
+        bit_parallel,
+        checkpoint_dir=checkpoint_dir,
+        resume=resume,
+        address=address,
+        shared_dir=shared_dir,
     )
 
-    pool.close()  # Remember to close the process pool
-
-    # Reduce the partial solutions
-    if len(closeness_scores) > 0:
-        closeness_cumulator = closeness_scores[0]
-        for closeness in closeness_scores[1:]:
-            for n in closeness:
-                if n not in closeness_cumulator:
-                    closeness_cumulator[n] = closeness[n]
-                else:
-                    closeness_cumulator[n] += closeness[n]
-        return closeness_cumulator
-    else:
-        return {}
+    return dict(zip(csr.nodes, scores.tolist()))
 
 
 def closeness_centrality(G, u=None, distance=None, wf_improved=True):
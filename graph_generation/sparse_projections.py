@@ -0,0 +1,56 @@
+# Sparse matrix projections of bipartite relations
+#
+# Expanding every paper into all of its ordered author pairs costs O(k²) Python
+# operations per paper. Instead, papers and authors are written as an incidence
+# matrix B (a row per paper, a column per author), and the author x author
+# co-authorship matrix is the sparse product BᵀB, with the amount of joint papers
+# of each pair as its entries. Likewise, author citations are AᵀCA, with C the
+# citing x cited papers matrix.
+
+# Core imports
+from typing import List, Tuple
+
+# Library imports
+import numpy as np
+import scipy.sparse as sp
+
+
+def incidence_matrix(groups: List[List[int]], n_columns: int, binary: bool = True) -> sp.csr_matrix:
+    """
+    Matrix with a row per group, with a 1 in the column of each of its members.
+    Unless `binary`, a member repeated in a group is counted as many times
+    """
+    indptr = np.zeros(len(groups) + 1, dtype=np.int64)
+    np.cumsum([len(group) for group in groups], out=indptr[1:])
+    indices = np.fromiter((member for group in groups for member in group), dtype=np.int32, count=indptr[-1])
+
+    B = sp.csr_matrix((np.ones(len(indices), dtype=np.int32), indices, indptr), shape=(len(groups), n_columns))
+
+    B.sum_duplicates()
+    if binary:
+        B.data[:] = 1
+    return B
+
+
+def co_membership(B: sp.csr_matrix) -> sp.coo_matrix:
+    """BᵀB without its diagonal: how many groups each pair of (distinct) columns share"""
+    W = (B.T @ B).tocoo()
+    off_diagonal = W.row != W.col
+    return sp.coo_matrix((W.data[off_diagonal], (W.row[off_diagonal], W.col[off_diagonal])), shape=W.shape)
+
+
+def citation_projection(
+    citing_groups: List[List[int]], cited_groups: List[List[int]], citations: List[Tuple[int, int]], n_columns: int
+) -> sp.coo_matrix:
+    """
+    AᵀCA: how many times each column (e.g. author) cites each other column, from the
+    members of the citing and cited papers, and the (citing, cited) papers indexes
+    """
+    citing, cited = zip(*citations) if citations else ((), ())
+    C = sp.csr_matrix(
+        (np.ones(len(citing), dtype=np.int32), (citing, cited)), shape=(len(citing_groups), len(cited_groups))
+    )
+
+    A_citing = incidence_matrix(citing_groups, n_columns, binary=False)
+    A_cited = incidence_matrix(cited_groups, n_columns, binary=False)
+    return (A_citing.T @ C @ A_cited).tocoo()
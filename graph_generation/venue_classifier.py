@@ -0,0 +1,113 @@
+# Canonical venue classifier, compiled from the CSRankings list in conferences.md
+#
+# `conferences.md` lists every CSRankings conference under its area and subarea,
+# either as names (`NeurIPS/NIPS`) or as the regexes really used to find them
+# (`^CVPR( \(\d+\))*$`). Every entry is compiled into a single alternation, with a
+# named group per entry, so one match tells which canonical venue (and area) a
+# raw venue string is. Results are memoized per distinct raw string.
+
+# Core imports
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+CONFERENCES_FILENAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "conferences.md")
+
+# `conference_ids` entries with this prefix select every venue of a CSRankings area,
+# subarea or canonical venue (e.g. "csrankings:systems"), instead of a raw venue
+CSRANKINGS_PREFIX = "csrankings:"
+
+ENTRY_PATTERN = re.compile(r"^\* (?P<venues>.+?) - [\d+ =]+ Papers\s*$")
+
+
+class Venue(NamedTuple):
+    venue: str
+    area: str
+    subarea: str
+
+
+def parse_conferences(filename: str = CONFERENCES_FILENAME) -> List[tuple]:
+    """(regex, Venue) of each entry in conferences.md"""
+    entries = []
+    area, subarea = "", ""
+
+    with open(filename, "r") as f:
+        for line in f:
+            if line.startswith("### "):
+                subarea = line[4:].strip()
+            elif line.startswith("## "):
+                area = line[3:].strip()
+            elif (match := ENTRY_PATTERN.match(line.strip())) is not None:
+                venues = match.group("venues").strip()
+                if venues.startswith("^"):
+                    # Already a regex, named after its leading literal
+                    pattern = venues.lstrip("^").rstrip("$")
+                    canonical = re.match(r"[\w\- ]+", pattern).group(0).strip()
+                else:
+                    names = [name.strip() for name in venues.split("/")]
+                    pattern = "|".join(re.escape(name) for name in names)
+                    canonical = names[0]
+
+                entries.append((pattern, Venue(canonical, area, subarea)))
+
+    return entries
+
+
+class VenueClassifier:
+    """Map raw venue strings to their CSRankings canonical venue, area and subarea"""
+
+    def __init__(self, filename: str = CONFERENCES_FILENAME):
+        entries = parse_conferences(filename)
+        self.venues = [venue for _, venue in entries]
+        self.automaton = re.compile(
+            "|".join(f"(?P<v{position}>{pattern})" for position, (pattern, _) in enumerate(entries)), re.IGNORECASE
+        )
+        self.cache: Dict[str, Optional[Venue]] = {}
+
+    def __call__(self, raw: Optional[str]) -> Optional[Venue]:
+        """Canonical venue of `raw`, or None if it isn't a CSRankings venue"""
+        try:
+            return self.cache[raw]
+        except KeyError:
+            pass
+
+        match = self.automaton.fullmatch(raw.strip()) if raw is not None else None
+        venue = self.cache[raw] = self.venues[int(match.lastgroup[1:])] if match is not None else None
+        return venue
+
+
+class VenueFilter:
+    """
+    Memoized `conference_ids` membership test: a raw venue is kept if its lowercase
+    is one of them, or if it is in one of their `csrankings:` areas or venues
+    """
+
+    def __init__(self, conference_ids: Iterable[str]):
+        conference_ids = {conference_id.lower() for conference_id in conference_ids}
+        self.raw_venues = {venue for venue in conference_ids if not venue.startswith(CSRANKINGS_PREFIX)}
+        self.selectors = {
+            venue[len(CSRANKINGS_PREFIX) :] for venue in conference_ids if venue.startswith(CSRANKINGS_PREFIX)
+        }
+        self.classifier = VenueClassifier() if self.selectors else None
+        self.cache: Dict[str, bool] = {}
+
+    def __call__(self, raw: Optional[str]) -> bool:
+        try:
+            return self.cache[raw]
+        except KeyError:
+            pass
+
+        keep = raw is not None and raw.lower() in self.raw_venues
+        if not keep and self.classifier is not None:
+            venue = self.classifier(raw)
+            keep = venue is not None and not self.selectors.isdisjoint(
+                (venue.venue.lower(), venue.area.lower(), venue.subarea.lower())
+            )
+
+        self.cache[raw] = keep
+        return keep
+
+
+def csrankings_areas(filename: str = CONFERENCES_FILENAME) -> List[str]:
+    """Every area in conferences.md, as `conference_ids` selectors"""
+    return list(dict.fromkeys(CSRANKINGS_PREFIX + venue.area.lower() for _, venue in parse_conferences(filename)))
@@ -0,0 +1,145 @@
+# Persistent index from venue to the byte offsets of its papers in the DBLP dump
+#
+# Filtering a conference set out of the dump means decoding every record just to
+# read `venue.raw`. This index is built once per dataset (in parallel, reusing
+# the sharded reader), and lets us seek straight to the records of the venues we
+# want, so reading a conference set costs time proportional to its own size.
+
+# Core imports
+import json
+import os
+from multiprocessing import Pool
+from typing import Iterator, List, Optional, Tuple
+
+# Library imports
+import numpy as np
+from tqdm import tqdm
+
+from dblp_shards import find_shard_boundaries, iter_shard_records
+from paper_store import StringTable
+from venue_classifier import CSRANKINGS_PREFIX, VenueFilter
+
+READ_SIZE = 64 * 1024
+
+
+def normalize_venue(raw: str) -> str:
+    """Venue key used in the index, matching how `conference_ids` are written"""
+    return raw.lower()
+
+
+def _index_shard(filename_start_end: Tuple[str, int, int]) -> dict:
+    """Map each normalized venue to the offsets of its records in a shard"""
+    filename, start, end = filename_start_end
+
+    venue_offsets = {}
+    for offset, record in iter_shard_records(filename, start, end, with_offsets=True):
+        raw = (record.get("venue") or {}).get("raw")
+        if raw is not None:
+            venue_offsets.setdefault(normalize_venue(raw), []).append(offset)
+
+    return venue_offsets
+
+
+class VenueIndex:
+    """
+    Normalized venue -> sorted byte offsets of its records, stored CSR-like
+    (`venues` string table, `indptr` and `offsets` arrays) in a directory
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(os.path.join(path, "manifest.json"), "r") as f:
+            self.manifest = json.load(f)
+
+        self.venues = StringTable.load(path, "venues").to_list()
+        self.venue_position = {venue: position for position, venue in enumerate(self.venues)}
+        self.indptr = np.load(os.path.join(path, "indptr.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+
+    @staticmethod
+    def exists(path: str, filename: str) -> bool:
+        """Check there is an index at `path`, built from the current version of `filename`"""
+        try:
+            with open(os.path.join(path, "manifest.json"), "r") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return False
+
+        return os.path.exists(filename) and manifest["size"] == os.path.getsize(filename)
+
+    def offsets_for(self, conference_ids: List[str]) -> np.ndarray:
+        """Sorted offsets of every record in one of the `conference_ids` venues"""
+        if any(venue.lower().startswith(CSRANKINGS_PREFIX) for venue in conference_ids):
+            # Areas can't be looked up by name, so every indexed venue is classified instead
+            venue_filter = VenueFilter(conference_ids)
+            positions = [position for position, venue in enumerate(self.venues) if venue_filter(venue)]
+        else:
+            positions = [self.venue_position.get(normalize_venue(venue)) for venue in set(conference_ids)]
+
+        chunks = [
+            self.offsets[self.indptr[position] : self.indptr[position + 1]]
+            for position in positions
+            if position is not None
+        ]
+
+        return np.sort(np.concatenate(chunks)) if chunks else np.array([], dtype=np.int64)
+
+    def read_records(self, filename: str, conference_ids: List[str]) -> Iterator[dict]:
+        """Seek to, and decode, only the records of the `conference_ids` venues"""
+        decoder = json.JSONDecoder()
+
+        with open(filename, "rb") as f:
+            for offset in tqdm(self.offsets_for(conference_ids).tolist(), desc="Reading indexed records"):
+                f.seek(offset)
+                data = b""
+                while True:
+                    chunk = f.read(READ_SIZE)
+                    data += chunk
+                    try:
+                        record, _ = decoder.raw_decode(data.decode("utf-8", errors="ignore"))
+                        break
+                    except json.JSONDecodeError:
+                        if not chunk:
+                            raise
+
+                yield record
+
+    @staticmethod
+    def build(filename: str, path: str, processes: Optional[int] = None) -> "VenueIndex":
+        """Index every record of the dump at `filename`, saving it to `path`"""
+        os.makedirs(path, exist_ok=True)
+
+        processes = processes or os.cpu_count()
+        shards = find_shard_boundaries(filename, processes * 4)
+        print(f"Indexing {filename} in {len(shards)} shards in {processes} cores")
+
+        venue_offsets = {}
+        with Pool(processes=processes) as pool:
+            tasks = [(filename, start, end) for start, end in shards]
+            # Shards come in order, so each venue offsets list stays sorted
+            for shard_offsets in tqdm(pool.imap(_index_shard, tasks), total=len(tasks)):
+                for venue, offsets in shard_offsets.items():
+                    venue_offsets.setdefault(venue, []).extend(offsets)
+
+        venues = list(venue_offsets.keys())
+        indptr = np.zeros(len(venues) + 1, dtype=np.int64)
+        np.cumsum([len(venue_offsets[venue]) for venue in venues], out=indptr[1:])
+        offsets = np.fromiter(
+            (offset for venue in venues for offset in venue_offsets[venue]), dtype=np.int64, count=indptr[-1]
+        )
+
+        StringTable.save(path, "venues", venues)
+        np.save(os.path.join(path, "indptr.npy"), indptr)
+        np.save(os.path.join(path, "offsets.npy"), offsets)
+
+        # Written last, so an interrupted build is never mistaken for an index
+        with open(os.path.join(path, "manifest.json"), "w") as f:
+            json.dump(
+                {"source": os.path.abspath(filename), "size": os.path.getsize(filename), "records": len(offsets)},
+                f,
+                indent=4,
+            )
+
+        print(f"Saved venue index with {len(venues)} venues and {len(offsets)} records to {path}")
+        return VenueIndex(path)
@@ -0,0 +1,77 @@
+# Core imports
+import json
+import os
+import sys
+
+# Library imports
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "graph_generation"))
+
+from generate_graph import GenerateGraph  # noqa: E402
+
+CONFERENCE_IDS = ["aaai", "neurips"]
+
+# A few authors, from orgs in different countries, publishing together over 2004-2006
+AUTHORS = {
+    "a1": "MIT, Cambridge, USA",
+    "a2": "Universidade de Sao Paulo, Brazil",
+    "a3": "University of Toronto, Canada",
+    "a4": "Sorbonne, Paris, France",
+}
+
+# (id, year, venue, authors, references)
+PAPERS = [
+    ("p1", 2004, "AAAI", ["a1", "a2"], []),
+    ("p2", 2004, "NeurIPS", ["a3"], ["p1"]),
+    ("p3", 2005, "AAAI", ["a1", "a2"], ["p1", "p2"]),
+    ("p4", 2005, "AAAI", ["a1", "a2", "a3"], ["p2"]),
+    ("p5", 2005, "ICML", ["a4"], ["p1"]),
+    ("p6", 2006, "NeurIPS", ["a1", "a2"], ["p3", "p4"]),
+    ("p7", 2006, "AAAI", ["a3", "a4"], ["p1", "p3"]),
+]
+
+
+def dblp_record(paper_id, year, venue, authors, references) -> dict:
+    return {
+        "_id": paper_id,
+        "title": f"Title of {paper_id}",
+        "year": year,
+        "venue": {"_id": venue.lower(), "raw": venue, "type": 0},
+        "authors": [{"id": author, "name": author.upper(), "org": AUTHORS[author]} for author in authors],
+        "references": references,
+    }
+
+
+@pytest.fixture
+def dblp_dump(tmp_path):
+    filename = tmp_path / "dblp.json"
+    with open(filename, "w") as f:
+        json.dump([dblp_record(*paper) for paper in PAPERS], f, indent=4)
+    return str(filename)
+
+
+@pytest.fixture
+def generation_paths(tmp_path, dblp_dump, monkeypatch):
+    """Every path generators read from or write to, in a temporary directory"""
+    monkeypatch.setattr(GenerateGraph, "DBLP_FILENAME", dblp_dump)
+    monkeypatch.setattr(GenerateGraph, "PAPER_STORE_PATH", str(tmp_path / "paper_store"))
+    monkeypatch.setattr(GenerateGraph, "VENUE_INDEX_PATH", str(tmp_path / "venue_index"))
+    monkeypatch.setattr(GenerateGraph, "CACHE_PATH", str(tmp_path / "cache"))
+    monkeypatch.setattr(GenerateGraph, "ID_DICTIONARY_PATH", str(tmp_path / "id_dictionary"))
+    for base_path, directory in [
+        ("GML_BASE_PATH", "GML"),
+        ("TEMPORAL_BASE_PATH", "GML/temporal"),
+        ("CHECKPOINT_BASE_PATH", "GML/checkpoints"),
+        ("CENTRALITY_BASE_PATH", "GML/centralities"),
+    ]:
+        os.makedirs(tmp_path / directory, exist_ok=True)
+        monkeypatch.setattr(GenerateGraph, base_path, str(tmp_path / directory) + "/")
+
+    # Nothing read by a previous test
+    monkeypatch.setattr(GenerateGraph, "_cached_conference_papers", (None, None))
+    monkeypatch.setattr(GenerateGraph, "_encoded_conference_papers", (None, None))
+    monkeypatch.setattr(GenerateGraph, "_id_dictionary", None)
+
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
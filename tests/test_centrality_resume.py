@@ -0,0 +1,67 @@
+# Core imports
+import os
+
+# Library imports
+import pytest
+
+from conftest import CONFERENCE_IDS
+from generate_citation_graph import CitationGraph
+from generate_graph import GenerateGraph
+
+
+class Crash(Exception):
+    pass
+
+
+def crash(*args, **kwargs):
+    raise Crash
+
+
+def centralities(generation: GenerateGraph, **options) -> None:
+    # Pivots for every node, so betweenness and closeness are computed apart
+    generation.compute_centralities(
+        betweenness=True,
+        closeness=True,
+        betweenness_k=generation.G.number_of_nodes(),
+        snapshot_name="citation_test_2006",
+        workers=1,
+        **options,
+    )
+
+
+@pytest.fixture
+def generation(generation_paths):
+    generation = CitationGraph(conference_ids=CONFERENCE_IDS, min_year=2000, max_year=2010, dense_ids=False)
+    generation.generate(
+        save_gpickle=False,
+        compute_degree=False,
+        compute_closeness=False,
+        compute_betweenness=False,
+        compute_pagerank=False,
+    )
+    return generation
+
+
+def test_resume_skips_the_measures_finished_before_a_crash(generation, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(generation, "compute_closeness", crash)
+        with pytest.raises(Crash):
+            centralities(generation)
+
+    # Betweenness was saved, and its source ranges removed, before closeness crashed
+    checkpoints = os.path.join(GenerateGraph.CHECKPOINT_BASE_PATH, "citation_test_2006")
+    assert sorted(os.listdir(checkpoints)) == ["finished"]
+    betweenness = dict(generation.G.nodes(data="betweenness"))
+
+    for node in generation.G:
+        generation.G.nodes[node].pop("betweenness")
+    monkeypatch.setattr(generation, "compute_betweeness", crash)
+    centralities(generation, resume=True)
+
+    assert dict(generation.G.nodes(data="betweenness")) == betweenness
+    assert None not in dict(generation.G.nodes(data="closeness")).values()
+    assert not os.path.exists(checkpoints)
+
+    # And a snapshot saved whole isn't computed again either
+    monkeypatch.setattr(generation, "compute_closeness", crash)
+    centralities(generation, resume=True)
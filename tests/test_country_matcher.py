@@ -0,0 +1,48 @@
+# Core imports
+import os
+
+# Library imports
+import pytest
+
+from country_matcher import CountryMatcher
+
+REPLACEMENT_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "graph_generation", "country_replacement.json"
+)
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return CountryMatcher.load(REPLACEMENT_PATH)
+
+
+@pytest.mark.parametrize(
+    "organization, expected",
+    [
+        # Abbreviations ("de", "in", "rs", "ca"...) as words of non-US orgs
+        ("Universidade de Sao Paulo, Brazil", (False, "brazil")),
+        ("Universidade de Sao Paulo", (False, "universidade de sao paulo")),
+        ("Instituto de Informatica, UFRGS, Porto Alegre, RS, Brazil", (False, "brazil")),
+        ("Universidad de Chile, Santiago, Chile", (False, "chile")),
+        ("Centre for Research in Computing, Open University, Milton Keynes", (False, "milton keynes")),
+        ("Universite de Montreal, Montreal, QC, Canada", (True, "canada")),
+        ("Ecole Polytechnique, Palaiseau, France", (True, "france")),
+    ],
+)
+def test_abbreviations_only_match_the_last_segment(matcher, organization, expected):
+    assert matcher(organization) == expected
+
+
+@pytest.mark.parametrize(
+    "organization, expected",
+    [
+        ("Stanford University, CA", "USA"),
+        ("Carnegie Mellon University, Pittsburgh, PA", "USA"),
+        ("MIT, Cambridge, MA 02139 USA", "USA"),
+        ("Tsinghua University, Beijing 100084", "china"),
+        ("Indian Institute of Technology, Chennai, India", "india"),
+        ("Inria, Paris, France", "france"),
+    ],
+)
+def test_known_countries_are_found(matcher, organization, expected):
+    assert matcher(organization) == (True, expected)
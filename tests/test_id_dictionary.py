@@ -0,0 +1,36 @@
+# Library imports
+import pytest
+
+import id_dictionary
+from id_dictionary import IdDictionary
+
+
+def test_interrupted_save_keeps_the_saved_dictionary(tmp_path, monkeypatch):
+    path = str(tmp_path / "ids")
+    ids = IdDictionary()
+    ids("a"), ids("b")
+    ids.save(path)
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    ids("c")
+    monkeypatch.setattr(id_dictionary.StringTable, "save", fail)
+    with pytest.raises(OSError):
+        ids.save(path)
+
+    assert IdDictionary.load(path).ids == ["a", "b"]
+    assert [entry.name for entry in tmp_path.iterdir()] == ["ids"]
+
+
+def test_save_refuses_to_drop_ids_saved_by_another_run(tmp_path):
+    path = str(tmp_path / "ids")
+    IdDictionary().save(path)
+    first, second = IdDictionary.load(path), IdDictionary.load(path)
+    first("a")
+    first.save(path)
+
+    second("b")
+    with pytest.raises(RuntimeError):
+        second.save(path)
+    assert IdDictionary.load(path).ids == ["a"]
@@ -0,0 +1,71 @@
+# Core imports
+import io
+import json
+import os
+import pickle
+
+# Library imports
+import json_stream
+
+from conftest import CONFERENCE_IDS, dblp_record
+from generate_citation_graph import CitationGraph
+from generate_graph import GenerateGraph
+
+
+def generate_citation_graph() -> CitationGraph:
+    generation = CitationGraph(
+        graph_name="citation",
+        conference_name="test",
+        conference_ids=CONFERENCE_IDS,
+        min_year=2000,
+        max_year=2010,
+        use_cache=True,
+        dense_ids=False,
+    )
+    generation.generate(
+        save_gpickle=False,
+        compute_degree=False,
+        compute_closeness=False,
+        compute_betweenness=False,
+        compute_pagerank=False,
+    )
+    return generation
+
+
+def test_json_dump_papers_are_cached(generation_paths):
+    generation = generate_citation_graph()
+    cache_dir = GenerateGraph.CACHE_PATH
+
+    # The papers streamed from the JSON dump were pickled, venues included, without leftovers
+    files = os.listdir(cache_dir)
+    assert files == [f"{generation.cache_key()}.pickle"]
+    with open(os.path.join(cache_dir, files[0]), "rb") as f:
+        cached_papers = pickle.load(f)
+    assert cached_papers[2004][0]["venue"] == {"_id": "aaai", "raw": "AAAI", "type": 0}
+
+    # And a new run reads them back from disk
+    GenerateGraph._cached_conference_papers = (None, None)
+    cached = generate_citation_graph()
+    assert sorted(cached.G.edges()) == sorted(generation.G.edges())
+    assert generation.G.number_of_nodes() == 6
+
+
+def test_failed_cache_save_leaves_no_temporary_file(generation_paths):
+    generation = CitationGraph(conference_ids=CONFERENCE_IDS, use_cache=True, dense_ids=False)
+
+    try:
+        generation.save_to_cache({2004: [{"venue": (value for value in [])}]})
+    except TypeError:
+        pass
+
+    assert os.listdir(GenerateGraph.CACHE_PATH) == []
+
+
+def test_get_data_of_a_streamed_record():
+    record = dblp_record("p1", 2004, "aaai", ["a1", "a2"], ["p0"])
+    streamed = next(iter(json_stream.load(io.StringIO(json.dumps([record]))).persistent()))
+
+    # Nested streamed containers come out as standard types, so the paper can be pickled
+    paper = GenerateGraph.get_data(streamed)
+    assert pickle.loads(pickle.dumps(paper)) == GenerateGraph.get_data(record)
+    assert type(paper["venue"]) is dict
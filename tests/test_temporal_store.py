@@ -0,0 +1,21 @@
+# Library imports
+import networkx as nx
+
+from edge_buffer import EdgeBuffer
+from temporal_store import TemporalGraphStore
+
+
+def test_checkpoints_start_at_the_first_year_with_edges(tmp_path):
+    edges = EdgeBuffer(capacity=4)
+    for year in range(1890, 2000):
+        edges.end_year(year)
+    for year in range(2000, 2006):
+        edges.add_edge(f"a{year}", f"b{year}", year)
+        edges.end_year(year)
+
+    G = edges.materialize(nx.Graph())
+    store = TemporalGraphStore.save(str(tmp_path / "store"), edges, G, checkpoint_every=2)
+
+    assert store.checkpoints == [2001, 2003, 2005]
+    assert store.manifest["years"] == [1890, 2005]
+    assert nx.utils.edges_equal(store.as_of(2004).edges, edges.materialize(nx.Graph(), until=edges.mark_at(2004)).edges)
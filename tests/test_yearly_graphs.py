@@ -0,0 +1,114 @@
+# Library imports
+import networkx as nx
+import pytest
+
+from conftest import CONFERENCE_IDS, PAPERS
+from generate_authors_citation_graph import AuthorsCitationGraph
+from generate_citation_graph import CitationGraph
+from generate_collaboration_graph import CollaborationGraph
+from generate_graph import GenerateGraph
+
+YEARS = (2004, 2005, 2006)
+
+
+def generate_yearly(generation: GenerateGraph) -> GenerateGraph:
+    generation.generate(
+        save_gpickle=False,
+        save_yearly_gpickle=True,
+        save_non_cummulated_yearly_gpickle=True,
+        compute_degree=False,
+        compute_closeness=False,
+        compute_betweenness=False,
+        compute_pagerank=False,
+    )
+    return generation
+
+
+def read_yearly(generation: GenerateGraph, year: int, graph_name: str) -> nx.Graph:
+    return nx.read_gpickle(
+        GenerateGraph.GML_BASE_PATH + f"{graph_name}_{generation.conference_name}_{year}_graph.gpickle"
+    )
+
+
+def weights(G: nx.Graph) -> dict:
+    return {(u, v): weight for u, v, weight in G.edges(data="weight")}
+
+
+@pytest.mark.parametrize(
+    "generator, options",
+    [(CollaborationGraph, {}), (AuthorsCitationGraph, {"aggregated": True})],
+)
+def test_yearly_weights_are_those_of_the_year(generation_paths, generator, options):
+    generation = generate_yearly(
+        generator(
+            graph_name="weighted",
+            conference_name="test",
+            conference_ids=CONFERENCE_IDS,
+            min_year=2000,
+            max_year=2010,
+            dense_ids=False,
+            **options,
+        )
+    )
+
+    # Each yearly graph has what the cumulative one gained that year, stamped with that year
+    previous = {}
+    for year in YEARS:
+        cumulative = weights(read_yearly(generation, year, "weighted"))
+        yearly_G = read_yearly(generation, year, "yearly_weighted")
+
+        gained = {edge: weight - previous.get(edge, 0) for edge, weight in cumulative.items()}
+        assert weights(yearly_G) == {edge: weight for edge, weight in gained.items() if weight > 0}
+        assert {year} == {edge_year for _, _, edge_year in yearly_G.edges(data="year")}
+        previous = cumulative
+
+
+def test_yearly_collaborations(generation_paths):
+    generation = generate_yearly(
+        CollaborationGraph(
+            graph_name="collaboration",
+            conference_name="test",
+            conference_ids=CONFERENCE_IDS,
+            min_year=2000,
+            max_year=2010,
+            dense_ids=False,
+        )
+    )
+
+    # a1 and a2 wrote p1 in 2004, p3 and p4 in 2005, and p6 in 2006
+    yearly = {year: weights(read_yearly(generation, year, "yearly_collaboration")) for year in YEARS}
+    assert yearly[2004] == {("a1", "a2"): 1, ("a2", "a1"): 1}
+    assert yearly[2005][("a1", "a2")] == 2
+    assert yearly[2005][("a1", "a3")] == 1
+    assert yearly[2006] == {("a1", "a2"): 1, ("a2", "a1"): 1, ("a3", "a4"): 1, ("a4", "a3"): 1}
+    assert yearly[2006].keys() <= weights(generation.G).keys()
+
+
+def test_yearly_citations_keep_the_centralities_apart(generation_paths):
+    generation = CitationGraph(
+        graph_name="citation",
+        conference_name="test",
+        conference_ids=CONFERENCE_IDS,
+        min_year=2000,
+        max_year=2007,
+        dense_ids=False,
+    )
+    generation.generate(
+        save_gpickle=False,
+        save_yearly_gpickle=True,
+        save_non_cummulated_yearly_gpickle=True,
+        compute_degree=True,
+        compute_closeness=False,
+        compute_betweenness=False,
+        compute_pagerank=False,
+    )
+
+    # Each yearly graph has the citations made that year, with degrees of its own
+    for year in YEARS:
+        yearly_G = read_yearly(generation, year, "yearly_citation")
+        citing = {paper for paper, paper_year, *_ in PAPERS if paper_year == year}
+        assert set(yearly_G.edges) == {(u, v) for u, v in generation.G.edges if u in citing}
+        assert dict(yearly_G.nodes(data="degree")) == dict(yearly_G.degree)
+
+    # While the cumulative graph keeps its own, even after the last yearly graph got them
+    assert dict(generation.G.nodes(data="degree")) == dict(generation.G.degree)